@@ -1,84 +1,438 @@
 """
 API e frontend simples para previsão de HH em produção.
 Carrega o modelo 5 features conforme config (versionamento MLOps).
-Uso: python app.py
+serving.engine no config: "numpy" (forward pass em NumPy, sem TensorFlow), "keras" ou
+"auto" (NumPy quando existe o .npz exportado no treino; senão Keras).
+Outras versões/variantes podem ser pedidas por requisição (?version=1.0.0&variant=4features)
+e ficam num pool LRU; uma versão candidata pode rodar em shadow sobre o tráfego real.
+Previsões unitárias repetidas saem de um cache LRU (limpo a cada troca de modelo).
+Com serving.metrics.enabled, GET /metrics expõe contadores, latências por fase e memória
+no formato do Prometheus; desligado, nenhuma medição roda no caminho da requisição.
+Uso: python app.py (servidor de desenvolvimento) ou python serve.py (produção)
 """
-import json
+import hmac
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-import tensorflow as tf
 import yaml
-import joblib
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
+
+from mlops.registry import from_config as registry_from_config
+from serving.batching import MicroBatcher
+from serving.cache import PredictionCache
+from pipeline.resources import current_rss_mb, peak_rss_mb
+from serving.inference import FusedMLP, KerasPredictor, npz_path
+from serving.metrics import Counter, Registry
+from serving.pool import ModelPool
+from serving.shadow import ShadowScorer
 
 BASE = Path(__file__).resolve().parent
 APP_DIR = BASE / "app"
 VARIANT = "5features"
+VARIANTS = ("4features", "5features")
 FEATURES = ["acft", "sum_daily_hours", "Cycles", "sum_uti_mensal", "age_fleet"]
+# Limite de linhas por chamada de /api/predict/batch
+BATCH_MAX_ROWS = 100_000
+# /metrics: fases do /api/predict e buckets de latência (segundos)
+PHASES = ("parse", "scale", "forward", "inverse")
+LATENCY_BUCKETS = [
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+]
 
 app = Flask(__name__, static_folder=str(APP_DIR), static_url_path="")
 
-_model = None
-_scaler_x = None
-_scaler_y = None
-_loaded_version = None
+_active = None  # ModelSnapshot em uso; trocado por atribuição (atômica) no hot-reload
+_batcher = None
+_ready = False
+_reload_lock = threading.Lock()
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+_last_reload_error = None
+_pool = None
+_shadow = None
+_cache = None
+_metrics = None  # AppMetrics se serving.metrics.enabled; None = sem medição
+_metrics_lock = threading.Lock()
+_config = (None, {})  # (mtime do config.yaml, config): relido só quando o arquivo muda
+_registry = (None, None)  # (config, ModelRegistry): um por processo, refeito quando o config muda
 
 
-def _resolve_models_dir():
-    """Define pasta do modelo: por versão (registry) ou flat (retrocompat)."""
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """Modelo carregado + identificação. Requisições em andamento seguem com o snapshot que pegaram."""
+    predictor: object
+    engine: str
+    version: str
+    variant: str
+    features: list
+    models_dir: Path
+    key: tuple
+    loaded_at: str
+    swapped_at: str
+    load_seconds: float = 0.0
+
+
+@dataclass
+class AppMetrics:
+    registry: Registry
+    requests: Counter
+    errors: Counter
+    latency: dict  # endpoint -> Histogram
+    phases: dict  # fase -> Histogram
+
+
+def _load_config() -> dict:
+    """config.yaml (relido só quando o mtime muda; o dict devolvido não deve ser alterado)."""
+    global _config
     config_path = BASE / "config.yaml"
-    if not config_path.exists():
-        return BASE / "models"
+    try:
+        mtime = config_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    cached = _config
+    if cached[0] == mtime:
+        return cached[1]
     with open(config_path, "r", encoding="utf-8") as f:
         config = yaml.safe_load(f) or {}
-    mlops = config.get("mlops", {})
-    prod_ver = mlops.get("production_version", "latest")
-    registry_path = BASE / mlops.get("registry_file", "models/registry.json")
+    _config = (mtime, config)
+    return config
 
-    if prod_ver != "latest" and prod_ver:
-        version_dir = BASE / "models" / prod_ver
+
+def _get_registry():
+    """Registry do processo (a cópia em memória do registry.json, sem banco, é reaproveitada)."""
+    global _registry
+    config = _load_config()
+    cached = _registry
+    if cached[0] is not config:
+        cached = (config, registry_from_config(config, BASE))
+        _registry = cached
+    return cached[1]
+
+
+def _registry_dir(entry: dict | None) -> Path | None:
+    if entry and entry.get("path"):
+        version_dir = (BASE / entry["path"]).resolve()
         if version_dir.exists():
             return version_dir
+    return None
+
 
-    if registry_path.exists():
+def _resolve_models_dir():
+    """Define pasta do modelo: versão de produção no registry, models/<versão> ou flat (retrocompat)."""
+    config = _load_config()
+    if not config:
+        return BASE / "models"
+    prod_ver = config.get("mlops", {}).get("production_version", "latest")
+    registry = _get_registry()
+    try:
+        version_dir = _registry_dir(registry.production(prod_ver))
+    except sqlite3.Error:
+        version_dir = None
+    if version_dir is not None:
+        return version_dir
+
+    if prod_ver not in (None, "", "latest", "production"):
+        # Versão fixada fora do registry (pasta copiada à mão); sem a pasta, vale a última
+        version_dir = BASE / "models" / prod_ver
+        if version_dir.exists():
+            return version_dir
         try:
-            with open(registry_path, "r", encoding="utf-8") as f:
-                registry = json.load(f)
-            versions = registry.get("versions", [])
-            if versions:
-                last = versions[-1]
-                path_rel = last.get("path", "")
-                version_dir = (BASE / path_rel).resolve()
-                if version_dir.exists():
-                    return version_dir
-        except (json.JSONDecodeError, KeyError):
-            pass
+            version_dir = _registry_dir(registry.latest())
+        except sqlite3.Error:
+            version_dir = None
+        if version_dir is not None:
+            return version_dir
 
     # Retrocompat: modelo na pasta models/ (sem subpasta de versão)
     return BASE / "models"
 
 
-def load_artifacts():
-    global _model, _scaler_x, _scaler_y, _loaded_version
-    if _model is not None:
-        return
-    models_dir = _resolve_models_dir()
-    model_path = models_dir / f"model_hh_semanal_{VARIANT}.keras"
-    scaler_x_path = models_dir / f"scaler_X_{VARIANT}.joblib"
-    scaler_y_path = models_dir / f"scaler_y_{VARIANT}.joblib"
-    if not model_path.exists():
-        raise FileNotFoundError(
-            f"Modelo não encontrado: {model_path}. Rode: python train.py [--version 1.0.0]"
+def resolved_engine(models_dir: Path | None = None, variant: str = VARIANT) -> str:
+    """Engine que load_artifacts vai usar: "numpy" ou "keras" (conforme config e arquivos)."""
+    engine = _load_config().get("serving", {}).get("engine", "auto")
+    if engine == "auto":
+        return "numpy" if npz_path(models_dir or _resolve_models_dir(), variant).exists() else "keras"
+    return engine
+
+
+def _model_file(models_dir: Path, engine: str, variant: str = VARIANT) -> Path:
+    if engine == "numpy":
+        return npz_path(models_dir, variant)
+    return models_dir / f"model_hh_semanal_{variant}.keras"
+
+
+def _snapshot_key(models_dir: Path, variant: str = VARIANT) -> tuple:
+    """Identifica o modelo em disco: pasta, engine e mtime do arquivo (muda ao promover/retreinar)."""
+    engine = resolved_engine(models_dir, variant)
+    path = _model_file(models_dir, engine, variant)
+    return (str(models_dir), engine, path.stat().st_mtime_ns if path.exists() else None)
+
+
+def _load_snapshot(models_dir: Path, variant: str = VARIANT) -> ModelSnapshot:
+    t0 = time.perf_counter()
+    key = _snapshot_key(models_dir, variant)
+    engine = key[1]
+    model_path = _model_file(models_dir, engine, variant)
+    if engine == "numpy":
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"Modelo NumPy não encontrado: {model_path}. "
+                f"Rode: python -m serving.inference --models-dir {models_dir}"
+            )
+        predictor = FusedMLP.load(model_path)
+    else:
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"Modelo não encontrado: {model_path}. Rode: python train.py [--version 1.0.0]"
+            )
+        # Só aqui o TensorFlow é importado
+        predictor = KerasPredictor(
+            model_path,
+            models_dir / f"scaler_X_{variant}.joblib",
+            models_dir / f"scaler_y_{variant}.joblib",
         )
-    _model = tf.keras.models.load_model(model_path)
-    _scaler_x = joblib.load(scaler_x_path)
-    _scaler_y = joblib.load(scaler_y_path)
     try:
-        _loaded_version = str(models_dir.relative_to(BASE)) if BASE in models_dir.parents else str(models_dir)
+        version = str(models_dir.relative_to(BASE)) if BASE in models_dir.parents else str(models_dir)
     except ValueError:
-        _loaded_version = str(models_dir)
+        version = str(models_dir)
+    agora = datetime.now().isoformat(timespec="seconds")
+    return ModelSnapshot(
+        predictor, engine, version, variant, list(predictor.features), models_dir, key, agora, agora,
+        load_seconds=time.perf_counter() - t0,
+    )
+
+
+def _warm(predictor) -> None:
+    x = np.ones(len(predictor.features), dtype=np.float32)
+    predictor.predict_one(x)
+    predictor.predict(np.tile(x, (8, 1)))
+
+
+def load_artifacts():
+    global _active, _batcher, _pool, _shadow, _cache
+    # Antes do modelo: uma falha de carga também aparece em /metrics (model_missing)
+    _ensure_metrics()
+    if _active is not None:
+        return
+    with _reload_lock:
+        if _active is not None:
+            return
+        snap = _load_snapshot(_resolve_models_dir())
+        serving_cfg = _load_config().get("serving", {})
+        # Opcional: agrupa /api/predict concorrentes numa única passada do modelo
+        mb = serving_cfg.get("micro_batching", {})
+        if mb.get("enabled", False) and _batcher is None:
+            _batcher = MicroBatcher(
+                max_batch=mb.get("max_batch", 32),
+                max_wait_ms=mb.get("max_wait_ms", 2.0),
+                timeout_ms=mb.get("timeout_ms", 1000),
+                on_phases=_observe_phases if _metrics is not None else None,
+            )
+        cache = serving_cfg.get("prediction_cache", {})
+        if cache.get("enabled", True) and _cache is None:
+            _cache = PredictionCache(
+                max_entries=cache.get("max_entries", 10_000), precision=cache.get("precision")
+            )
+        if _pool is None:
+            _pool = ModelPool(budget_mb=serving_cfg.get("model_pool", {}).get("budget_mb", 256))
+        shadow = serving_cfg.get("shadow", {})
+        if shadow.get("version") and _shadow is None:
+            _shadow = ShadowScorer(
+                lambda: _get_model(shadow["version"], shadow.get("variant", VARIANT)),
+                sample_rate=shadow.get("sample_rate", 1.0),
+            )
+        # Por último: quem vê _active já publicado (e sai cedo acima) encontra pool, cache etc. prontos
+        _active = snap
+
+
+def _ensure_metrics() -> None:
+    """Cria as métricas (uma vez por processo) se serving.metrics.enabled; não depende do modelo."""
+    if _metrics is not None or not _load_config().get("serving", {}).get("metrics", {}).get("enabled", False):
+        return
+    with _metrics_lock:
+        if _metrics is None:
+            _init_metrics()
+
+
+def _init_metrics() -> None:
+    global _metrics
+    reg = Registry()
+    m = AppMetrics(
+        registry=reg,
+        requests=reg.counter("hh_requests_total", "Requisições atendidas, por endpoint e status HTTP."),
+        errors=reg.counter("hh_prediction_errors_total", "Erros de previsão, por endpoint e tipo."),
+        latency={
+            ep: reg.histogram(
+                "hh_request_duration_seconds", "Latência total da requisição.", LATENCY_BUCKETS, endpoint=ep
+            )
+            for ep in ("predict", "predict_batch")
+        },
+        phases={
+            ph: reg.histogram(
+                "hh_predict_phase_seconds",
+                "Tempo por fase da previsão (no engine numpy escala e inversa vão dentro de forward).",
+                LATENCY_BUCKETS,
+                phase=ph,
+            )
+            for ph in PHASES
+        },
+    )
+    reg.gauge("hh_model_load_seconds", "Tempo de carga do modelo de produção em uso.",
+              lambda: _active.load_seconds if _active else None)
+    reg.gauge("hh_prediction_cache_hits_total", "Acertos do cache de previsões.",
+              lambda: _cache.hits if _cache else None, kind="counter")
+    reg.gauge("hh_prediction_cache_misses_total", "Falhas do cache de previsões.",
+              lambda: _cache.misses if _cache else None, kind="counter")
+    reg.gauge("process_resident_memory_bytes", "RSS atual do processo.",
+              lambda: _mb_to_bytes(current_rss_mb()))
+    reg.gauge("process_peak_resident_memory_bytes", "Pico de RSS do processo.",
+              lambda: _mb_to_bytes(peak_rss_mb()))
+    _metrics = m
+
+
+def _mb_to_bytes(mb: float | None) -> int | None:
+    return int(mb * 2**20) if mb is not None else None
+
+
+def _error(endpoint: str, kind: str, message: str, status: int):
+    """Resposta de erro da previsão (e contagem por tipo em /metrics)."""
+    if _metrics is not None:
+        _metrics.errors.inc(endpoint=endpoint, type=kind)
+    return jsonify({"error": message}), status
+
+
+def _observe_phases(phases: dict) -> None:
+    for ph, seconds in phases.items():
+        _metrics.phases[ph].observe(seconds)
+
+
+def _resolve_version_dir(version: str) -> Path:
+    """Pasta de uma versão: 'production'/'latest' = a ativa; senão pelo registry ou models/<versão>."""
+    if version in ("production", "latest"):
+        return _active.models_dir
+    if not re.fullmatch(r"[\w.\-]+", version):
+        raise LookupError(f"Versão inválida: {version}")
+    try:
+        version_dir = _registry_dir(_get_registry().get(version))
+    except sqlite3.Error:
+        version_dir = None
+    if version_dir is not None:
+        return version_dir
+    version_dir = BASE / "models" / version
+    if not version_dir.exists():
+        raise LookupError(f"Versão não encontrada: {version}")
+    return version_dir
+
+
+def _get_model(version: str | None = None, variant: str | None = None) -> ModelSnapshot:
+    """Modelo de produção, ou (versão, variante) pedido, carregado sob demanda no pool."""
+    load_artifacts()
+    snap = _active
+    if not version and not variant:
+        return snap
+    variant = variant or VARIANT
+    if variant not in VARIANTS:
+        raise LookupError(f"Variante inválida: {variant}. Use uma de {list(VARIANTS)}.")
+    models_dir = _resolve_version_dir(version) if version else snap.models_dir
+    if models_dir == snap.models_dir and variant == snap.variant:
+        return snap
+    return _pool.get((str(models_dir), variant), lambda: _load_snapshot(models_dir, variant))
+
+
+def _request_model() -> ModelSnapshot:
+    return _get_model(request.args.get("version"), request.args.get("variant"))
+
+
+def reload_model(force: bool = False) -> dict:
+    """
+    Carrega o modelo de _resolve_models_dir() se ele mudou (pasta, engine ou arquivo), aquece
+    e troca o snapshot ativo. Em caso de erro o modelo anterior continua servindo.
+    """
+    global _active, _last_reload_error
+    # Primeira carga (ex.: reload antes de qualquer previsão) também cria pool, cache etc.
+    load_artifacts()
+    with _reload_lock:
+        atual = _active
+        models_dir = _resolve_models_dir()
+        try:
+            if not force and atual is not None and _snapshot_key(models_dir) == atual.key:
+                return {"swapped": False, "version": atual.version}
+            novo = _load_snapshot(models_dir)
+            _warm(novo.predictor)
+        except Exception as e:
+            _last_reload_error = f"{type(e).__name__}: {e}"
+            print(f"Aviso: falha ao recarregar o modelo ({_last_reload_error}); mantendo o atual.")
+            raise
+        novo = replace(novo, swapped_at=datetime.now().isoformat(timespec="seconds"))
+        _active = novo
+        _last_reload_error = None
+        if _cache is not None:
+            _cache.clear()
+    print(f"Modelo trocado: {atual.version if atual else '-'} -> {novo.version} ({novo.engine})")
+    return {"swapped": True, "version": novo.version, "swapped_at": novo.swapped_at}
+
+
+def _watch(intervalo: float) -> None:
+    while True:
+        time.sleep(intervalo)
+        try:
+            reload_model()
+        except Exception:
+            pass  # já registrado em _last_reload_error; tenta de novo no próximo ciclo
+
+
+@app.before_request
+def _ensure_watcher() -> None:
+    """
+    Inicia (uma vez por processo que atende requisições) o polling de config/registry/modelo,
+    se serving.reload_poll_seconds > 0. No gunicorn cada worker tem o seu.
+    """
+    global _watcher_pid
+    if _watcher_pid == os.getpid():
+        return
+    with _watcher_lock:
+        if _watcher_pid == os.getpid():
+            return
+        _watcher_pid = os.getpid()
+    intervalo = float(_load_config().get("serving", {}).get("reload_poll_seconds", 0) or 0)
+    if intervalo > 0:
+        threading.Thread(target=_watch, args=(intervalo,), name="model-watcher", daemon=True).start()
+
+
+@app.before_request
+def _metrics_start() -> None:
+    if _metrics is not None:
+        g.metrics_t0 = time.perf_counter()
+
+
+@app.after_request
+def _metrics_end(response):
+    m = _metrics
+    if m is not None:
+        m.requests.inc(endpoint=request.endpoint or "none", status=str(response.status_code))
+        hist = m.latency.get(request.endpoint)
+        t0 = g.get("metrics_t0")
+        if hist is not None and t0 is not None:
+            hist.observe(time.perf_counter() - t0)
+    return response
+
+
+def warm_up():
+    """Carrega o modelo e roda uma previsão unitária e uma em lote; só então o app fica pronto."""
+    global _ready
+    load_artifacts()
+    _warm(_active.predictor)
+    _ready = True
 
 
 @app.route("/")
@@ -90,48 +444,217 @@ def index():
 @app.route("/api/predict", methods=["POST"])
 def predict():
     """
-    Recebe JSON com as 5 features, retorna HH previsto.
+    Recebe JSON com as features, retorna HH previsto.
     Exemplo: {"acft": 260, "sum_daily_hours": 2200, "Cycles": 1500, "sum_uti_mensal": 9000, "age_fleet": 1e7}
+    Opcional: ?version=1.0.0&variant=4features (padrão: modelo de produção, 5 features).
     """
     try:
-        load_artifacts()
+        snap = _request_model()
     except FileNotFoundError as e:
-        return jsonify({"error": str(e)}), 500
+        return _error("predict", "model_missing", str(e), 500)
+    except LookupError as e:
+        return _error("predict", "unknown_model", str(e), 404)
+    features = snap.features
+    m = _metrics
+    t0 = time.perf_counter() if m is not None else 0.0
 
     data = request.get_json(force=True, silent=True) or {}
-    missing = [f for f in FEATURES if f not in data]
+    missing = [f for f in features if f not in data]
     if missing:
-        return jsonify({"error": f"Features faltando: {missing}"}), 400
+        return _error("predict", "missing_features", f"Features faltando: {missing}", 400)
 
     try:
-        X = pd.DataFrame([[float(data[f]) for f in FEATURES]], columns=FEATURES)
+        x = np.array([float(data[f]) for f in features], dtype=np.float32)
     except (TypeError, ValueError) as e:
-        return jsonify({"error": f"Valores inválidos: {e}"}), 400
+        return _error("predict", "invalid_values", f"Valores inválidos: {e}", 400)
+    if m is not None:
+        m.phases["parse"].observe(time.perf_counter() - t0)
+
+    cache_key = _cache.key((snap.key, snap.variant), x) if _cache is not None else None
+    HH = _cache.get(cache_key) if cache_key is not None else None
+    if HH is None:
+        if _batcher is not None:
+            # O lote roda no predictor deste snapshot (não no _active da hora do lote);
+            # com métricas, o batcher registra as fases de cada passada
+            timed = _batcher.on_phases is not None
+            HH = _batcher.submit(x, snap.predictor.predict_timed if timed else snap.predictor.predict)
+        elif m is not None:
+            HH, phases = snap.predictor.predict_one_timed(x)
+            _observe_phases(phases)
+        else:
+            HH = snap.predictor.predict_one(x)
+        if cache_key is not None:
+            _cache.put(cache_key, HH)
+    if _shadow is not None and snap is _active:
+        _shadow.submit(x[None, :], np.array([HH]), features)
+
+    return jsonify({
+        "HH": round(HH, 4),
+        "features_used": features,
+        "model_version": snap.version,
+        "variant": snap.variant,
+    })
+
+
+def _predict_frame(snap: ModelSnapshot, X: pd.DataFrame) -> np.ndarray:
+    """Roda o modelo numa única passada e devolve HH (1 valor por linha)."""
+    X = X[snap.features].to_numpy(dtype=np.float32)
+    if _metrics is None:
+        return snap.predictor.predict(X)
+    y, phases = snap.predictor.predict_timed(X)
+    _observe_phases(phases)
+    return y
+
+
+def _batch_records() -> pd.DataFrame:
+    """
+    Lê o lote da requisição: lista JSON de registros, {"records": [...]} ou CSV
+    (upload 'file' ou corpo text/csv). Levanta ValueError com a mensagem para o cliente.
+    """
+    upload = request.files.get("file")
+    if upload is not None or request.mimetype == "text/csv":
+        raw = upload.read() if upload is not None else request.get_data()
+        try:
+            return pd.read_csv(io.BytesIO(raw), dtype=str)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+            raise ValueError(f"CSV inválido: {e}")
+
+    data = request.get_json(force=True, silent=True)
+    if isinstance(data, dict):
+        data = data.get("records")
+    if not isinstance(data, list):
+        raise ValueError('Envie uma lista de registros, {"records": [...]} ou um CSV.')
+    # Registros que não são objetos viram linhas vazias (erro por linha, não do lote)
+    return pd.DataFrame.from_records([r if isinstance(r, dict) else {} for r in data])
+
+
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Previsão em lote: valida todas as linhas de uma vez e roda uma única passada do modelo.
+    Entrada: [{"acft": ..., ...}, ...], {"records": [...]} ou CSV com as colunas das features.
+    Saída: predictions na ordem de entrada (null nas linhas inválidas) e errors por linha.
+    """
+    try:
+        snap = _request_model()
+    except FileNotFoundError as e:
+        return _error("predict_batch", "model_missing", str(e), 500)
+    except LookupError as e:
+        return _error("predict_batch", "unknown_model", str(e), 404)
+    features = snap.features
+    m = _metrics
+    t0 = time.perf_counter() if m is not None else 0.0
+
+    try:
+        df = _batch_records()
+    except ValueError as e:
+        return _error("predict_batch", "invalid_batch", str(e), 400)
+    if len(df) > BATCH_MAX_ROWS:
+        return _error(
+            "predict_batch", "batch_too_large", f"Lote com {len(df)} linhas; máximo {BATCH_MAX_ROWS}.", 413
+        )
+
+    df = df.reindex(columns=features)
+    X = df.apply(pd.to_numeric, errors="coerce").astype(np.float64)
+    invalid = ~np.isfinite(X.to_numpy())
+
+    errors = []
+    for i in np.flatnonzero(invalid.any(axis=1)):
+        faltando = [f for f, bad, raw in zip(features, invalid[i], df.iloc[i]) if bad and pd.isna(raw)]
+        ruins = [f for f, bad, raw in zip(features, invalid[i], df.iloc[i]) if bad and not pd.isna(raw)]
+        partes = []
+        if faltando:
+            partes.append(f"Features faltando: {faltando}")
+        if ruins:
+            partes.append(f"Valores inválidos: {ruins}")
+        errors.append({"row": int(i), "error": "; ".join(partes)})
+        if m is not None:
+            m.errors.inc(endpoint="predict_batch", type="invalid_values" if ruins else "missing_features")
+
+    ok = ~invalid.any(axis=1)
+    if m is not None:
+        m.phases["parse"].observe(time.perf_counter() - t0)
+    predictions = np.full(len(df), np.nan)
+    if ok.any():
+        predictions[ok] = _predict_frame(snap, X[ok])
+        if _shadow is not None and snap is _active:
+            _shadow.submit(X[ok].to_numpy(dtype=np.float32), predictions[ok], features)
+
+    return jsonify({
+        "predictions": [round(float(v), 4) if ok_i else None for v, ok_i in zip(predictions, ok)],
+        "errors": errors,
+        "n_rows": int(len(df)),
+        "n_ok": int(ok.sum()),
+        "features_used": features,
+        "model_version": snap.version,
+        "variant": snap.variant,
+    })
+
+
+@app.route("/api/ready")
+def ready():
+    """Readiness: 200 só depois do warm-up (modelo carregado e já executado uma vez)."""
+    if not _ready:
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True, "engine": _active.engine, "model_version": _active.version})
+
+
+@app.route("/api/admin/reload", methods=["POST"])
+def admin_reload():
+    """
+    Recarrega o modelo conforme config/registry (só troca se mudou; ?force=1 troca sempre).
+    Exige o header X-Admin-Token igual a serving.admin_token; sem token no config, o endpoint
+    fica desligado (use serving.reload_poll_seconds).
+    """
+    token = str(_load_config().get("serving", {}).get("admin_token") or "")
+    if not token:
+        return jsonify({"error": "Reload desligado: defina serving.admin_token"}), 403
+    enviado = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(enviado.encode("utf-8"), token.encode("utf-8")):
+        return jsonify({"error": "Não autorizado"}), 403
+    try:
+        return jsonify(reload_model(force=request.args.get("force") in ("1", "true")))
+    except Exception as e:
+        return jsonify({"error": f"Falha ao recarregar: {e}"}), 500
 
-    X_scaled = _scaler_x.transform(X)
-    y_scaled = _model.predict(X_scaled, verbose=0)
-    HH = float(_scaler_y.inverse_transform(y_scaled)[0, 0])
 
-    return jsonify({"HH": round(HH, 4), "features_used": FEATURES})
+@app.route("/metrics")
+def metrics():
+    """Métricas no formato texto do Prometheus (404 se serving.metrics.enabled for false)."""
+    _ensure_metrics()
+    if _metrics is None:
+        return jsonify({"error": "Métricas desligadas (serving.metrics.enabled: false)"}), 404
+    return Response(_metrics.registry.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/api/info")
 def info():
     """Informações do modelo (features, variante, versão carregada)."""
+    snap = _active
     return jsonify({
-        "variant": VARIANT,
-        "features": FEATURES,
-        "model_version": _loaded_version,
+        # Do snapshot ativo (o registro pode promover outra variante); as constantes só sem modelo
+        "variant": snap.variant if snap else VARIANT,
+        "features": list(snap.features) if snap else FEATURES,
+        "model_version": snap.version if snap else None,
+        "engine": snap.engine if snap else None,
+        "loaded_at": snap.loaded_at if snap else None,
+        "swapped_at": snap.swapped_at if snap else None,
+        "last_reload_error": _last_reload_error,
+        "micro_batching": _batcher.stats() if _batcher is not None else None,
+        "prediction_cache": _cache.stats() if _cache is not None else None,
+        "model_pool": _pool.stats() if _pool is not None else None,
+        "shadow": _shadow.stats() if _shadow is not None else None,
         "description": "Previsão de HH (Homem-Hora) semanal - itens não programados B737NG",
     })
 
 
 if __name__ == "__main__":
     try:
-        load_artifacts()
-        print(f"Modelo carregado (versão: {_loaded_version or 'models'}).")
+        warm_up()
+        print(f"Modelo carregado (versão: {_active.version}, engine: {_active.engine}).")
     except FileNotFoundError as e:
         print("Aviso:", e)
         print("Rode: python train.py [--version 1.0.0]")
-    print("Acesse: http://127.0.0.1:5000")
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    port = int(os.environ.get("PORT", 5000))
+    print(f"Acesse: http://127.0.0.1:{port}")
+    app.run(host="0.0.0.0", port=port, debug=False)
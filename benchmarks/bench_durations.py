@@ -0,0 +1,72 @@
+"""
+Micro-benchmark da conversão 'HH:MM' -> decimal: implementação anterior (split + to_numeric)
+vs pipeline.durations.hhmm_to_decimal. Confere também que os resultados são idênticos.
+Uso: python benchmarks/bench_durations.py [--rows 2000000] [--repeat 3]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline.durations import hhmm_to_decimal
+
+
+def legacy_hh_to_decimal(series: pd.Series) -> pd.Series:
+    """Cópia da implementação anterior de process_unscheduled_hh._hh_to_decimal."""
+    parts = series.astype(str).str.split(":", expand=True)
+    if parts.shape[1] < 2:
+        return pd.to_numeric(series, errors="coerce")
+    h = pd.to_numeric(parts[0], errors="coerce").fillna(0)
+    m = pd.to_numeric(parts[1], errors="coerce").fillna(0)
+    return h + (m * 100 / 60) / 100
+
+
+def make_series(rows: int, seed: int = 0) -> pd.Series:
+    """Mistura parecida com Hours/TAH reais: maioria 'H:MM', alguns nulos e valores sujos."""
+    rng = np.random.default_rng(seed)
+    h = rng.integers(0, 60000, rows)
+    m = rng.integers(0, 60, rows)
+    values = pd.Series([f"{a}:{b:02d}" for a, b in zip(h, m)], dtype=object)
+    sujos = rng.random(rows) < 0.01
+    values[sujos] = rng.choice(["nan", "", "1.5", "0:00:00", " 1:30"], sujos.sum())
+    return values
+
+
+def _best_of(fn, series: pd.Series, repeat: int) -> float:
+    tempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(series)
+        tempos.append(time.perf_counter() - t0)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HH:MM -> decimal")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    series = make_series(args.rows)
+    a = legacy_hh_to_decimal(series).to_numpy(dtype=np.float64)
+    b = hhmm_to_decimal(series).to_numpy(dtype=np.float64)
+    if not np.array_equal(a, b, equal_nan=True):
+        print("ERRO: resultados diferentes entre as implementações")
+        return 1
+
+    t_old = _best_of(legacy_hh_to_decimal, series, args.repeat)
+    t_new = _best_of(hhmm_to_decimal, series, args.repeat)
+    print(f"{args.rows} linhas (melhor de {args.repeat})")
+    print(f"  split + to_numeric : {t_old:.3f}s")
+    print(f"  hhmm_to_decimal    : {t_new:.3f}s")
+    print(f"  speedup            : {t_old / t_new:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
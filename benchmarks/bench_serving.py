@@ -0,0 +1,116 @@
+"""
+Benchmark do serving: servidor de desenvolvimento (python app.py) vs produção (python serve.py).
+Para cada um: sobe o processo, mede o tempo até /api/ready responder 200, dispara
+--requests POST /api/predict com --concurrency clientes e mede throughput e latência.
+Uso: python benchmarks/bench_serving.py [--requests 2000] [--concurrency 16] [--workers 2] [--threads 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parent.parent
+PAYLOAD = json.dumps({
+    "acft": 260, "sum_daily_hours": 2200, "Cycles": 1500, "sum_uti_mensal": 9000, "age_fleet": 1e7,
+}).encode("utf-8")
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120) -> float:
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Servidor terminou com código {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/api/ready", timeout=1) as r:
+                if r.status == 200:
+                    return time.perf_counter() - t0
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url}/api/ready não ficou pronto em {timeout}s")
+
+
+def _load(url: str, requests: int, concurrency: int) -> dict:
+    latencias = []
+    erros = [0]
+    lock = threading.Lock()
+    por_cliente = requests // concurrency
+
+    def cliente():
+        local = []
+        for _ in range(por_cliente):
+            req = urllib.request.Request(
+                f"{url}/api/predict", data=PAYLOAD, headers={"Content-Type": "application/json"}
+            )
+            t = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=30) as r:
+                    r.read()
+                local.append(time.perf_counter() - t)
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                with lock:
+                    erros[0] += 1
+        with lock:
+            latencias.extend(local)
+
+    threads = [threading.Thread(target=cliente) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - t0
+    lat = np.array(latencias) * 1000
+    return {
+        "req_s": len(lat) / total,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+        "erros": erros[0],
+    }
+
+
+def _bench(nome: str, cmd: list[str], port: int, env: dict, args) -> dict:
+    url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(cmd, cwd=BASE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pronto = _wait_ready(url, proc)
+        res = _load(url, args.requests, args.concurrency)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    res["ready_s"] = pronto
+    print(f"{nome:<12} pronto em {pronto:5.2f}s | {res['req_s']:7.0f} req/s | "
+          f"p50 {res['p50_ms']:6.1f} ms | p99 {res['p99_ms']:6.1f} ms | erros {res['erros']}")
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app.py (dev) vs serve.py (produção)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    print(f"{args.requests} requisições, {args.concurrency} clientes")
+    _bench("app.py (dev)", [sys.executable, "app.py"], 5051, dict(env, PORT="5051"), args)
+    _bench(
+        "serve.py",
+        [sys.executable, "serve.py", "--port", "5052", "--host", "127.0.0.1",
+         "--workers", str(args.workers), "--threads", str(args.threads)],
+        5052, env, args,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Suíte de benchmarks ponta a ponta em dados sintéticos (benchmarks/synthetic_data.py).
+Para cada escala (padrão 1x, 10x e 100x): gera o projeto sintético (reaproveitado entre
+execuções), roda run_data_pipeline.py (tempo por etapa), train.py e dispara POST /api/predict
+contra o serve.py (200 x escala requisições). Mede tempo total, CPU e pico de RSS de cada
+processo e grava tudo em JSON (benchmarks/results/<data>_<commit>.json), para comparar
+commits com --compare.
+Uso: python benchmarks/run_benchmarks.py [--scales 1 10 100] [--skip train serving]
+     [--compare benchmarks/results/anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bench_serving import _load, _wait_ready
+from synthetic_data import generate
+
+BASE = Path(__file__).resolve().parent.parent
+STAGE_LINE = re.compile(r"^\s{2}(\S+)\s+([\d.]+)s\s+(\S+)\s*$")
+TRAIN_LINE = re.compile(r"Tempo total de treino: ([\d.]+)s")
+
+
+def _run(cmd: list[str], env: dict | None = None) -> dict:
+    """Roda o comando e devolve saída, tempo de parede e (Linux/macOS) CPU e pico de RSS."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd, cwd=BASE, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace"
+    )
+    out = proc.stdout.read()
+    res = {"wall_s": 0.0, "cpu_s": None, "peak_rss_mb": None}
+    if hasattr(os, "wait4"):
+        # rusage do próprio processo (inclui os filhos que ele esperou, ex.: workers de ingestão)
+        _, status, ru = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        res["cpu_s"] = round(ru.ru_utime + ru.ru_stime, 3)
+        res["peak_rss_mb"] = round(ru.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+    else:
+        proc.wait()
+    res["wall_s"] = round(time.perf_counter() - t0, 3)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} terminou com código {proc.returncode}:\n{out[-3000:]}")
+    res["output"] = out
+    return res
+
+
+def bench_pipeline(config: Path) -> dict:
+    res = _run([sys.executable, "run_data_pipeline.py", "--config", str(config), "--force", "--no-cache"])
+    stages = {}
+    for line in res.pop("output").splitlines():
+        m = STAGE_LINE.match(line)
+        if m:
+            stages[m.group(1)] = {"seconds": float(m.group(2)), "status": m.group(3)}
+    res["stages"] = stages
+    return res
+
+
+def bench_train(config: Path) -> dict:
+    res = _run([sys.executable, "train.py", "--config", str(config), "--version", "bench"])
+    m = TRAIN_LINE.search(res.pop("output"))
+    res["fit_s"] = float(m.group(1)) if m else None
+    return res
+
+
+def bench_serving(requests: int, concurrency: int, port: int) -> dict:
+    """serve.py com o modelo de produção do repositório (o modelo não muda com a escala dos dados)."""
+    url = f"http://127.0.0.1:{port}"
+    cmd = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port)]
+    proc = subprocess.Popen(cmd, cwd=BASE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pronto = _wait_ready(url, proc)
+        res = _load(url, requests, concurrency)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    res.update({"ready_s": round(pronto, 3), "requests": requests, "concurrency": concurrency})
+    return res
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _flatten(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        chave = f"{prefix}.{k}" if prefix else str(k)
+        if isinstance(v, dict):
+            out.update(_flatten(v, chave))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[chave] = v
+    return out
+
+
+def compare(atual: dict, anterior: dict) -> None:
+    """Imprime as métricas em comum e a razão atual/anterior (> 1 = mais lento/maior, exceto req/s)."""
+    a, b = _flatten(atual["scales"]), _flatten(anterior["scales"])
+    print(f"\nComparação com {anterior.get('commit')} ({anterior.get('created_at')}):")
+    for chave in sorted(set(a) & set(b)):
+        if not b[chave]:
+            continue
+        razao = a[chave] / b[chave]
+        marca = ""
+        if chave.endswith(("wall_s", "seconds", "p99_ms", "peak_rss_mb")) and razao > 1.2:
+            marca = "  <-- regressão?"
+        if chave.endswith("req_s") and razao < 0.8:
+            marca = "  <-- regressão?"
+        print(f"  {chave:<48} {b[chave]:>12.3f} -> {a[chave]:>12.3f}  ({razao:5.2f}x){marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks ponta a ponta em dados sintéticos")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--work-dir", default=str(BASE / "benchmarks" / ".work"), help="Projetos sintéticos")
+    parser.add_argument("--output", default=None, help="JSON de saída (padrão: benchmarks/results/<data>_<commit>.json)")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["pipeline", "train", "serving"])
+    parser.add_argument("--regenerate", action="store_true", help="Gerar os dados sintéticos de novo")
+    parser.add_argument("--epochs", type=int, default=2, help="Épocas do treino no benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="Requisições /api/predict na escala 1x")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=5053)
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    resultado = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scales": {},
+    }
+    for scale in args.scales:
+        projeto = Path(args.work_dir) / f"scale_{scale}"
+        r = {}
+        resumo_path = projeto / "synthetic.json"
+        if args.regenerate or not resumo_path.exists():
+            print(f"[{scale}x] Gerando dados sintéticos em {projeto}...")
+            t0 = time.perf_counter()
+            resumo = generate(projeto, scale=scale, epochs=args.epochs)
+            r["generate_s"] = round(time.perf_counter() - t0, 3)
+        else:
+            with open(resumo_path, "r", encoding="utf-8") as f:
+                resumo = json.load(f)
+        r["data"] = {
+            "aircraft": resumo["aircraft"],
+            "unscheduled_rows": resumo["unscheduled_rows"],
+            "utilization_rows": resumo["utilization_rows"],
+            "raw_bytes": sum(f["bytes"] for f in resumo["files"]),
+        }
+        config = projeto / "config.yaml"
+        if "pipeline" not in args.skip:
+            r["pipeline"] = bench_pipeline(config)
+            print(f"[{scale}x] pipeline: {r['pipeline']['wall_s']:.2f}s, pico {r['pipeline']['peak_rss_mb']} MB "
+                  + " ".join(f"{k}={v['seconds']:.2f}s" for k, v in r["pipeline"]["stages"].items()))
+        if "train" not in args.skip:
+            r["train"] = bench_train(config)
+            print(f"[{scale}x] treino: {r['train']['wall_s']:.2f}s (fit {r['train']['fit_s']}s)")
+        if "serving" not in args.skip:
+            r["serving"] = bench_serving(args.requests * scale, args.concurrency, args.port)
+            s = r["serving"]
+            print(f"[{scale}x] /api/predict: {s['req_s']:.0f} req/s, p50 {s['p50_ms']:.1f} ms, "
+                  f"p99 {s['p99_ms']:.1f} ms, erros {s['erros']}")
+        resultado["scales"][str(scale)] = r
+
+    if args.output:
+        out = Path(args.output)
+    else:
+        out = BASE / "benchmarks" / "results" / f"{datetime.now():%Y%m%d-%H%M%S}_{commit or 'sem-git'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\nResultados: {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(resultado, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Gerador de dados brutos sintéticos no formato dos exports reais (que são confidenciais),
+para reproduzir problemas de desempenho da pipeline, do treino e do app fora do ambiente.
+Gera um projeto completo (pastas + config.yaml) com:
+- Events Unscheduled em Excel: formato antigo (COLS_OLD, HH como texto 'H:MM') até 2020 e
+  formato 2021 (COLS_2021, HH em horas decimais) a partir de 2021, um workbook por ano;
+  inclui outros tipos de aeronave, ATA 'ADMINISTRATIVE - GENERAL', HH executado '0:00'
+  (cai no planejado) e HH inválido longo ('1900-01-01 ...', descartado pela pipeline).
+- Utilização em CSV (USECOLS): datas 'YYYY.MM.DD', Hours e TAH 'H:MM', Cycles com "'" na
+  frente, TAH/TAC acumulados por aeronave, linhas com data '0 ' e Hours vazio, e os últimos
+  dias de cada arquivo repetidos no seguinte (exports sobrepostos).
+A escala multiplica o tamanho da frota (--scale 10 = 10x aeronaves e 10x linhas).
+Uso: python benchmarks/synthetic_data.py --out /tmp/hh_sint [--scale 1] [--fleet 15] [--years 8]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline.ingest_unscheduled import COLS_2021, COLS_OLD
+from pipeline.process_utilization import USECOLS
+
+FORMATO_2021_DESDE = 2021
+ATAS = [
+    (21, "AIR CONDITIONING"), (24, "ELECTRICAL POWER"), (25, "EQUIPMENT/FURNISHINGS"),
+    (29, "HYDRAULIC POWER"), (32, "LANDING GEAR"), (36, "PNEUMATIC"), (49, "AIRBORNE AUXILIARY POWER"),
+    (52, "DOORS"), (71, "POWER PLANT"), (5, "ADMINISTRATIVE - GENERAL"),
+]
+ESTACOES = ["GRU", "CGH", "GIG", "BSB", "CNF", "POA", "REC", "SSA"]
+SINAIS = ["MECH", "PILOT", "CABIN", "INSP"]
+
+
+def _hhmm(horas: np.ndarray) -> np.ndarray:
+    """Horas decimais -> texto 'H:MM' (como nos exports)."""
+    minutos = np.round(np.asarray(horas) * 60).astype(np.int64)
+    return np.char.add(np.char.add((minutos // 60).astype(str), ":"), np.char.zfill((minutos % 60).astype(str), 2))
+
+
+def _fleet(n: int) -> list[str]:
+    return [f"PR-G{i // 26 // 26 % 26 + 65:c}{i // 26 % 26 + 65:c}{i % 26 + 65:c}" for i in range(n)]
+
+
+def unscheduled_year(rng, prefixos: list[str], ano: int, eventos_por_aeronave: int) -> pd.DataFrame:
+    """Itens não programados de um ano, já com os nomes de coluna do formato do ano."""
+    n = len(prefixos) * eventos_por_aeronave
+    inicio = pd.Timestamp(f"{ano}-01-01")
+    dias = 366 if inicio.is_leap_year else 365
+    datas = inicio + pd.to_timedelta(rng.integers(0, dias, n), unit="D")
+    ata = rng.integers(0, len(ATAS), n)
+    planejado = np.round(rng.gamma(1.6, 1.4, n), 2)
+    executado = np.round(planejado * rng.lognormal(0, 0.35, n), 2)
+    sem_execucao = rng.random(n) < 0.12
+    executado[sem_execucao] = 0.0
+    tipo = rng.choice(["B737NG", "B737NG", "B737NG", "B737NG", "B767", "E190"], n)
+    comum = {
+        "SIGN": rng.choice(SINAIS, n),
+        "AC": rng.choice(prefixos, n),
+        "ATA": [ATAS[i][0] for i in ata],
+    }
+    if ano < FORMATO_2021_DESDE:
+        plan_txt = _hhmm(planejado).astype(object)
+        exec_txt = _hhmm(executado).astype(object)
+        # Durações > 24h que o Excel exporta como data (texto longo, filtrado pela pipeline)
+        longos = rng.random(n) < 0.003
+        exec_txt[longos] = "1900-01-01 05:30:00"
+        df = pd.DataFrame({
+            "SIGN": comum["SIGN"], "AC": comum["AC"], "AC Type": tipo,
+            "ISSUE STATION": rng.choice(ESTACOES, n), "CLOSING DATE": datas, "ATA": comum["ATA"],
+            "ATA DESC": [ATAS[i][1] for i in ata], "HH Planejado WO": plan_txt, "HH Executado WO": exec_txt,
+        })
+        return df[COLS_OLD]
+    df = pd.DataFrame({
+        "SIGN": comum["SIGN"], "AC": comum["AC"], "AC_Type": tipo,
+        "ISSUE_STATION": rng.choice(ESTACOES, n), "CLOSING_DATE": datas, "ATA": comum["ATA"],
+        "DESCRIPTION": [ATAS[i][1] for i in ata], "hh_plan": planejado, "hh_exec": executado,
+    })
+    return df[COLS_2021]
+
+
+def utilization_year(rng, prefixos: list[str], ano: int, tah: np.ndarray, tac: np.ndarray) -> pd.DataFrame:
+    """Utilização diária de um ano; tah/tac (acumulados por aeronave) são atualizados no lugar."""
+    dias = pd.date_range(f"{ano}-01-01", f"{ano}-12-31")
+    n_ac = len(prefixos)
+    voa = rng.random((len(dias), n_ac)) < 0.8
+    horas = np.where(voa, np.round(rng.uniform(2, 13, (len(dias), n_ac)) * 60) / 60, 0.0)
+    ciclos = np.where(voa, rng.integers(1, 8, (len(dias), n_ac)), 0)
+    tah_dia = tah + np.cumsum(horas, axis=0)
+    tac_dia = tac + np.cumsum(ciclos, axis=0)
+    tah[:] = tah_dia[-1]
+    tac[:] = tac_dia[-1]
+
+    d, a = np.nonzero(voa)
+    n = len(d)
+    df = pd.DataFrame({
+        "Dep. Date": dias[d].strftime("%Y.%m.%d"),
+        "A/C": np.array(prefixos, dtype=object)[a],
+        "AC-Type": "B737-800",
+        "# per Day": ciclos[d, a],
+        "Hours": _hhmm(horas[d, a]).astype(object),
+        "Cycles": np.char.add("'", ciclos[d, a].astype(str)).astype(object),
+        "TAH": _hhmm(tah_dia[d, a]).astype(object),
+        "TAC": tac_dia[d, a],
+    })
+    # Sujeiras dos exports: data '0 ' e Hours vazio
+    sujas = rng.random(n) < 0.002
+    df.loc[sujas, "Dep. Date"] = "0 "
+    vazias = rng.random(n) < 0.002
+    df.loc[vazias, "Hours"] = np.nan
+    return df[USECOLS]
+
+
+def config_yaml(root: Path, epochs: int = 2) -> str:
+    return f"""paths:
+  project_root: "{root.as_posix()}"
+  unscheduled_all: "raw/Unscheduled"
+  unscheduled_2021: "raw/Unscheduled_2021"
+  utilization_dir: "raw/Utilization"
+  data_processed: "processed"
+  dataset_semanal: "processed/dataset_uti_vs_hh_semanal.csv"
+  models_dir: "models"
+  cache_dir: "cache"
+
+data_pipeline:
+  encoding: "ISO-8859-1"
+  required_columns: ["date", "acft", "sum_daily_hours", "age_fleet", "Cycles", "sum_uti_mensal", "HH"]
+  min_date: "2014-12-31"
+  ac_type_filter: "B737NG"
+  ingest_workers: 2
+  artifact_format: "parquet"
+
+training:
+  epochs: {epochs}
+
+mlops:
+  production_version: "latest"
+  registry_file: "models/registry.json"
+"""
+
+
+def generate(
+    out: Path,
+    scale: int = 1,
+    fleet: int = 15,
+    years: int = 8,
+    end_year: int = 2022,
+    events_per_aircraft: int = 60,
+    overlap_days: int = 5,
+    seed: int = 0,
+    epochs: int = 2,
+) -> dict:
+    """Gera o projeto sintético em out e devolve um resumo (arquivos, linhas, bytes)."""
+    out = Path(out).resolve()
+    rng = np.random.default_rng(seed)
+    dirs = {
+        "old": out / "raw" / "Unscheduled",
+        "2021": out / "raw" / "Unscheduled_2021",
+        "util": out / "raw" / "Utilization",
+    }
+    for d in list(dirs.values()) + [out / "processed"]:
+        d.mkdir(parents=True, exist_ok=True)
+    prefixos = _fleet(fleet * scale)
+    anos = list(range(end_year - years + 1, end_year + 1))
+
+    resumo = {"scale": scale, "aircraft": len(prefixos), "years": anos, "unscheduled_rows": 0,
+              "utilization_rows": 0, "files": []}
+    tah = rng.uniform(5_000, 60_000, len(prefixos))
+    tac = rng.integers(2_000, 30_000, len(prefixos)).astype(np.int64)
+    anterior = None
+    for ano in anos:
+        uns = unscheduled_year(rng, prefixos, ano, events_per_aircraft)
+        destino = dirs["2021"] if ano >= FORMATO_2021_DESDE else dirs["old"]
+        path = destino / f"Events_Unscheduled_{ano}.xlsx"
+        uns.to_excel(path, index=False)
+        resumo["unscheduled_rows"] += len(uns)
+        resumo["files"].append({"path": str(path.relative_to(out)), "rows": len(uns), "bytes": path.stat().st_size})
+
+        uti = utilization_year(rng, prefixos, ano, tah, tac)
+        if anterior is not None and overlap_days:
+            # Export sobreposto: últimos dias do ano anterior repetidos no início do arquivo
+            datas = anterior["Dep. Date"]
+            ultimos = sorted(d for d in datas.unique() if d != "0 ")[-overlap_days:]
+            uti = pd.concat([anterior[datas.isin(ultimos)], uti], ignore_index=True)
+        path = dirs["util"] / f"Utilization_{ano}.csv"
+        uti.to_csv(path, index=False, encoding="utf-8")
+        resumo["utilization_rows"] += len(uti)
+        resumo["files"].append({"path": str(path.relative_to(out)), "rows": len(uti), "bytes": path.stat().st_size})
+        anterior = uti
+
+    (out / "config.yaml").write_text(config_yaml(out, epochs), encoding="utf-8")
+    with open(out / "synthetic.json", "w", encoding="utf-8") as f:
+        json.dump(resumo, f, indent=2)
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados brutos sintéticos (Unscheduled + Utilização)")
+    parser.add_argument("--out", required=True, help="Pasta do projeto sintético (criada se não existir)")
+    parser.add_argument("--scale", type=int, default=1, help="Multiplicador do tamanho da frota")
+    parser.add_argument("--fleet", type=int, default=15, help="Aeronaves na escala 1x")
+    parser.add_argument("--years", type=int, default=8, help="Anos de histórico")
+    parser.add_argument("--end-year", type=int, default=2022)
+    parser.add_argument("--events-per-aircraft", type=int, default=60, help="Itens não programados por aeronave/ano")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    resumo = generate(
+        Path(args.out), scale=args.scale, fleet=args.fleet, years=args.years, end_year=args.end_year,
+        events_per_aircraft=args.events_per_aircraft, seed=args.seed,
+    )
+    print(f"{resumo['aircraft']} aeronaves, {len(resumo['years'])} anos: "
+          f"{resumo['unscheduled_rows']:,} itens não programados, {resumo['utilization_rows']:,} linhas de utilização")
+    print(f"Projeto: {Path(args.out).resolve()} (rode: python run_data_pipeline.py --config "
+          f"{Path(args.out).resolve() / 'config.yaml'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
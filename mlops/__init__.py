@@ -0,0 +1 @@
+# Registry de modelos (MLOps) - TCC Previsão HH
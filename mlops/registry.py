@@ -0,0 +1,304 @@
+"""
+Registry de versões do modelo em SQLite (mlops.registry_db, padrão models/registry.sqlite).
+- register() grava a versão numa transação (BEGIN IMMEDIATE): treinos simultâneos entram em
+  fila no lock do SQLite em vez de um sobrescrever o registry.json do outro.
+- Busca indexada por versão, 'latest' (último registro) e 'production' (mlops.production_version).
+- Métricas numéricas de cada variante ficam numa tabela própria para consultas como
+  best('RMSE', '5features', last=10) = menor RMSE da variante nas últimas 10 versões.
+- registry.json (mlops.registry_file) continua sendo gravado a cada registro (export atômico:
+  arquivo temporário + os.replace) para quem lê o formato antigo; mlops.registry_json_export:
+  false desliga (python -m mlops.registry export gera sob demanda). Na criação do banco, um
+  registry.json existente é importado; depois o SQLite é a fonte.
+Só register() cria o banco; consultas sem o banco (ex.: app numa pasta só leitura, antes do
+primeiro treino com o registry novo) usam uma cópia em memória importada do registry.json,
+refeita só quando o arquivo muda. Quem consulta com frequência (app) mantém um
+ModelRegistry por processo.
+Uso: python -m mlops.registry [--config config.yaml] latest | show <versão> | best RMSE 5features [--last 10]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# Métricas em que maior é melhor (as demais, ex.: MAE/RMSE, menor é melhor)
+HIGHER_IS_BETTER = {"R2", "Adj_R2"}
+METRICS_PREFIX = "metrics_"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    version TEXT NOT NULL,
+    trained_at TEXT,
+    path TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_version ON versions (version, id);
+CREATE TABLE IF NOT EXISTS metrics (
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    variant TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (version_id, variant, metric)
+);
+CREATE INDEX IF NOT EXISTS metrics_lookup ON metrics (variant, metric, version_id);
+"""
+
+
+def _metric_rows(entry: dict) -> list[tuple]:
+    """(variante, métrica, valor) das chaves metrics_<variante> da entrada (só valores numéricos)."""
+    rows = []
+    for key, values in entry.items():
+        if key.startswith(METRICS_PREFIX) and isinstance(values, dict):
+            variant = key[len(METRICS_PREFIX):]
+            for metric, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    rows.append((variant, metric, float(value)))
+    return rows
+
+
+def _export_json(conn: sqlite3.Connection, path: Path) -> None:
+    """
+    registry.json no formato antigo ({"versions": [...]}) a partir do banco. As entradas já
+    estão guardadas como JSON e são copiadas como texto; a troca do arquivo é atômica.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write('{"versions": [')
+            for i, (entry,) in enumerate(conn.execute("SELECT entry FROM versions ORDER BY id")):
+                f.write(("\n  " if i == 0 else ",\n  ") + entry)
+            f.write("\n]}\n")
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class ModelRegistry:
+    def __init__(self, db_path, json_path=None, export_json: bool = True, timeout: float = 30.0):
+        self.db_path = Path(db_path)
+        self.json_path = Path(json_path) if json_path else None
+        self.export_json_on_register = export_json
+        self.timeout = timeout
+        self._memory = None  # cópia em memória do registry.json enquanto o banco não existe
+        self._memory_stamp = None  # (mtime, tamanho) do registry.json importado na cópia
+        self._memory_lock = threading.Lock()
+        self._schema_ok = False  # tabelas do banco já conferidas por esta instância
+
+    @contextmanager
+    def _conn(self, create: bool = False):
+        """Conexão por operação (arquivo) ou a cópia em memória, serializada entre threads."""
+        conn, in_memory = self._connect(create)
+        if in_memory:
+            with self._memory_lock:
+                yield conn
+            return
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _connect(self, create: bool = False) -> tuple[sqlite3.Connection, bool]:
+        """(conexão, é a cópia em memória)."""
+        if self.db_path.exists():
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            if not self._schema_ok:
+                try:
+                    # Banco recém-criado por outro processo pode ainda não ter as tabelas
+                    conn.executescript(_SCHEMA)
+                except sqlite3.OperationalError:
+                    pass  # banco só leitura: as tabelas já existem
+                self._schema_ok = True
+            return conn, False
+        if create:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._import_json(conn)
+            self._schema_ok = True
+            return conn, False
+        with self._memory_lock:
+            stamp = self._json_stamp()
+            if self._memory is None or stamp != self._memory_stamp:
+                memory = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+                memory.executescript(_SCHEMA)
+                self._import_json(memory)
+                self._memory, self._memory_stamp = memory, stamp
+            return self._memory, True
+
+    def _json_stamp(self) -> tuple | None:
+        try:
+            st = self.json_path.stat()
+        except (AttributeError, OSError):
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _import_json(self, conn: sqlite3.Connection) -> None:
+        """Importa o registry.json (formato antigo) se o banco ainda está vazio."""
+        if self.json_path is None or not self.json_path.exists():
+            return
+        try:
+            with open(self.json_path, "r", encoding="utf-8") as f:
+                entries = json.load(f).get("versions", [])
+        except (json.JSONDecodeError, AttributeError):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM versions LIMIT 1").fetchone() is None:
+                for entry in entries:
+                    self._insert(conn, entry)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, entry: dict) -> int:
+        cur = conn.execute(
+            "INSERT INTO versions (version, trained_at, path, entry) VALUES (?, ?, ?, ?)",
+            (str(entry["version"]), entry.get("trained_at"), entry.get("path"), json.dumps(entry)),
+        )
+        version_id = cur.lastrowid
+        conn.executemany(
+            "INSERT OR REPLACE INTO metrics (version_id, variant, metric, value) VALUES (?, ?, ?, ?)",
+            [(version_id, *row) for row in _metric_rows(entry)],
+        )
+        return version_id
+
+    def register(self, entry: dict) -> int:
+        """Registra uma versão (entrada no formato do registry.json) e atualiza o export JSON."""
+        with self._conn(create=True) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version_id = self._insert(conn, entry)
+                # Export ainda dentro da transação: o JSON reflete exatamente o banco após este registro
+                if self.json_path is not None and self.export_json_on_register:
+                    _export_json(conn, self.json_path)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return version_id
+
+    @staticmethod
+    def _entries(conn: sqlite3.Connection, sql: str = "SELECT entry FROM versions ORDER BY id", args=()) -> list:
+        return [json.loads(row[0]) for row in conn.execute(sql, args)]
+
+    def _one(self, sql: str, args=()) -> dict | None:
+        with self._conn() as conn:
+            rows = self._entries(conn, sql, args)
+        return rows[0] if rows else None
+
+    def get(self, version: str) -> dict | None:
+        """Último registro da versão (retreinos com o mesmo nome ficam com o mais recente)."""
+        return self._one("SELECT entry FROM versions WHERE version = ? ORDER BY id DESC LIMIT 1", (str(version),))
+
+    def latest(self) -> dict | None:
+        return self._one("SELECT entry FROM versions ORDER BY id DESC LIMIT 1")
+
+    def production(self, production_version: str | None = "latest") -> dict | None:
+        """Entrada de mlops.production_version ('latest'/vazio = último registro)."""
+        if production_version in (None, "", "latest", "production"):
+            return self.latest()
+        return self.get(production_version)
+
+    def versions(self, last: int | None = None) -> list[dict]:
+        """Entradas em ordem de registro (as last mais recentes, se informado)."""
+        with self._conn() as conn:
+            if last:
+                return self._entries(
+                    conn, "SELECT entry FROM (SELECT id, entry FROM versions ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (int(last),),
+                )
+            return self._entries(conn)
+
+    def best(self, metric: str = "RMSE", variant: str = "5features", last: int | None = None) -> dict | None:
+        """
+        Versão com a melhor métrica da variante (menor, ou maior para R2/Adj_R2), entre as last
+        versões mais recentes (todas, sem last). Devolve a entrada com 'value' = valor da métrica.
+        """
+        ordem = "DESC" if metric in HIGHER_IS_BETTER else "ASC"
+        recorte = "SELECT id FROM versions ORDER BY id DESC" + (" LIMIT ?" if last else "")
+        args = (variant, metric) + ((int(last),) if last else ())
+        with self._conn() as conn:
+            row = conn.execute(
+                f"SELECT v.entry, m.value FROM metrics m JOIN versions v ON v.id = m.version_id "
+                f"WHERE m.variant = ? AND m.metric = ? AND m.version_id IN ({recorte}) "
+                f"ORDER BY m.value {ordem}, m.version_id DESC LIMIT 1",
+                args,
+            ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "value": row[1]}
+
+    def export_json(self, path=None) -> Path:
+        path = Path(path) if path else self.json_path
+        with self._conn() as conn:
+            _export_json(conn, path)
+        return path
+
+
+def from_config(config: dict, root) -> ModelRegistry:
+    """Registry das chaves mlops.registry_db / registry_file / registry_json_export (relativas a root)."""
+    mlops = (config or {}).get("mlops", {})
+    root = Path(root)
+    return ModelRegistry(
+        root / mlops.get("registry_db", "models/registry.sqlite"),
+        root / mlops.get("registry_file", "models/registry.json"),
+        export_json=mlops.get("registry_json_export", True),
+    )
+
+
+def main():
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Consultas ao registry de modelos")
+    parser.add_argument("--config", default="config.yaml")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("latest", help="Última versão registrada")
+    sub.add_parser("production", help="Versão de mlops.production_version")
+    show = sub.add_parser("show", help="Entrada de uma versão")
+    show.add_argument("version")
+    best = sub.add_parser("best", help="Melhor versão por métrica e variante")
+    best.add_argument("metric", help="MAE, RMSE, R2, Adj_R2")
+    best.add_argument("variant", help="4features ou 5features")
+    best.add_argument("--last", type=int, default=None, help="Só as N versões mais recentes")
+    sub.add_parser("export", help="Regrava o registry.json a partir do banco")
+    args = parser.parse_args()
+
+    base = Path(__file__).resolve().parent.parent
+    config_path = base / args.config
+    config = {}
+    if config_path.exists():
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    root = Path(config.get("paths", {}).get("project_root", "."))
+    reg = from_config(config, root if root.is_absolute() else base / root)
+
+    if args.cmd == "export":
+        print(f"Exportado: {reg.export_json()}")
+        return 0
+    if args.cmd == "latest":
+        entry = reg.latest()
+    elif args.cmd == "production":
+        entry = reg.production(config.get("mlops", {}).get("production_version", "latest"))
+    elif args.cmd == "show":
+        entry = reg.get(args.version)
+    else:
+        entry = reg.best(args.metric, args.variant, last=args.last)
+    if entry is None:
+        print("Nenhuma versão encontrada.")
+        return 1
+    print(json.dumps(entry, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Leitura e escrita dos artefatos da pipeline (intermediários e dataset final).
+Formatos: parquet e feather (tipados, sem re-parse) ou csv (legado / exportação).
+O caminho configurado (ex.: dataset_uti_vs_hh_semanal.csv) define o nome; a extensão
+segue o formato escolhido.
+"""
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from pipeline import schema as _schema
+
+FORMATS = ("csv", "parquet", "feather")
+# Chamados após cada arquivo gravado por write(): fn(path, rows, seconds) (perfil da pipeline)
+_write_listeners = []
+
+
+def add_write_listener(fn) -> None:
+    _write_listeners.append(fn)
+
+
+def remove_write_listener(fn) -> None:
+    if fn in _write_listeners:
+        _write_listeners.remove(fn)
+
+
+def _notify(path: Path, rows: int, t0: float) -> None:
+    seconds = time.perf_counter() - t0
+    for fn in list(_write_listeners):
+        fn(path, rows, seconds)
+
+
+def artifact_path(path, fmt: str) -> Path:
+    """Caminho do artefato no formato fmt (troca só a extensão)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de artefato inválido: {fmt}. Use um de {FORMATS}.")
+    return Path(path).with_suffix(f".{fmt}")
+
+
+def find(path, fmt: str) -> Path | None:
+    """Artefato existente para path: primeiro no formato fmt, depois o CSV (legado)."""
+    for candidato in (artifact_path(path, fmt), artifact_path(path, "csv")):
+        if candidato.exists():
+            return candidato
+    return None
+
+
+def write(df: pd.DataFrame, path, fmt: str = "csv", export_csv: bool = False) -> Path:
+    """Grava df no formato fmt (e também em CSV se export_csv). Retorna o caminho principal."""
+    out = artifact_path(path, fmt)
+    t0 = time.perf_counter()
+    if fmt == "parquet":
+        df.to_parquet(out, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(out)
+    else:
+        df.to_csv(out, index=False)
+    _notify(out, len(df), t0)
+    if export_csv and fmt != "csv":
+        t0 = time.perf_counter()
+        df.to_csv(artifact_path(path, "csv"), index=False)
+        _notify(artifact_path(path, "csv"), len(df), t0)
+    return out
+
+
+def read(path, schema: dict | None = None, encoding: str | None = None) -> pd.DataFrame:
+    """
+    Lê um artefato pela extensão. Parquet/feather já voltam tipados; no CSV o schema
+    (pipeline.schema) define dtypes e datas.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if suffix == ".feather":
+        return pd.read_feather(path)
+    kwargs = _schema.read_kwargs(schema) if schema else {}
+    if encoding:
+        kwargs["encoding"] = encoding
+    return pd.read_csv(path, **kwargs)
+
+
+def iter_chunks(path, chunksize: int, columns: list[str] | None = None, schema: dict | None = None):
+    """
+    Blocos de até chunksize linhas de um artefato, sem carregar o arquivo inteiro
+    (parquet por row group/batch, feather por record batch, csv com chunksize).
+    columns restringe a leitura às colunas pedidas.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif suffix == ".feather":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                df = batch.to_pandas()
+                for start in range(0, len(df), chunksize):
+                    yield df.iloc[start:start + chunksize]
+    else:
+        kwargs = _schema.read_kwargs(schema) if schema else {}
+        if columns is not None:
+            kwargs["usecols"] = columns
+            if "parse_dates" in kwargs:
+                kwargs["parse_dates"] = [c for c in kwargs["parse_dates"] if c in columns]
+        yield from pd.read_csv(path, chunksize=chunksize, **kwargs)
@@ -1,54 +1,82 @@
 """
 Junção dos dados de HH (agrupado) com utilização e construção do dataset final semanal.
 """
+import json
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
 
-def run(
+WEEK = pd.Timedelta(days=7)
+
+
+def _ac_dtype(*series: pd.Series) -> pd.CategoricalDtype:
+    """Prefixos (AC) dos três frames numa única categoria, para o merge comparar só códigos inteiros."""
+    valores = pd.concat(
+        [pd.Series(np.asarray(s.dropna().unique(), dtype=object)) for s in series],
+        ignore_index=True,
+    )
+    return pd.CategoricalDtype(pd.Index(valores).unique())
+
+
+def _join_daily(
     df_hh: pd.DataFrame,
     df_utilizacao: pd.DataFrame,
     df_utl_tah: pd.DataFrame,
-    min_date: str = "2014-12-31",
 ) -> pd.DataFrame:
     """
-    df_hh: colunas CLOSING_DATE, AC, HH
-    df_utilizacao: Dep._Date, A/C, Hours_dec, Cycles
-    df_utl_tah: Dep._Date, A/C, Hours_dec, TAH_dec
-    Faz merge por key_id = date + AC, depois agregação semanal e merge com sum_uti_mensal.
+    Merge diário por (date, AC). Retorna date, acft, sum_daily_hours, age_fleet, Cycles, HH.
+    As chaves são datetime64 + categórico compartilhado (equivale ao antigo key_id =
+    str(date) + AC, sem montar strings por linha).
     """
-    df_utilizacao = df_utilizacao.copy()
-    df_utilizacao["Dep._Date"] = pd.to_datetime(df_utilizacao["Dep._Date"])
-    df_utilizacao["key_id"] = df_utilizacao["Dep._Date"].astype(str) + df_utilizacao["A/C"]
-    df_utilizacao = df_utilizacao[["key_id", "Dep._Date", "A/C", "Hours_dec", "Cycles"]]
-
-    df_hh = df_hh.copy()
-    df_hh["CLOSING_DATE"] = pd.to_datetime(df_hh["CLOSING_DATE"])
-    df_hh["key_id"] = df_hh["CLOSING_DATE"].astype(str) + df_hh["AC"]
+    ac = _ac_dtype(df_utilizacao["A/C"], df_hh["AC"], df_utl_tah["A/C"])
+    keys = ["Dep._Date", "A/C"]
 
-    df_utl_tah = df_utl_tah.copy()
-    df_utl_tah["Dep._Date"] = pd.to_datetime(df_utl_tah["Dep._Date"])
-    df_utl_tah["key_id"] = df_utl_tah["Dep._Date"].astype(str) + df_utl_tah["A/C"]
-    df_utl_tah = df_utl_tah[["key_id", "TAH_dec"]]
+    df_utilizacao = pd.DataFrame({
+        "Dep._Date": pd.to_datetime(df_utilizacao["Dep._Date"]).astype("datetime64[ns]"),
+        "A/C": df_utilizacao["A/C"].astype(ac),
+        "Hours_dec": df_utilizacao["Hours_dec"],
+        "Cycles": df_utilizacao["Cycles"],
+    })
+    df_hh = pd.DataFrame({
+        "Dep._Date": pd.to_datetime(df_hh["CLOSING_DATE"]).astype("datetime64[ns]"),
+        "A/C": df_hh["AC"].astype(ac),
+        "HH": df_hh["HH"],
+    })
+    df_utl_tah = pd.DataFrame({
+        "Dep._Date": pd.to_datetime(df_utl_tah["Dep._Date"]).astype("datetime64[ns]"),
+        "A/C": df_utl_tah["A/C"].astype(ac),
+        "TAH_dec": df_utl_tah["TAH_dec"],
+    })
 
     df_interme = pd.merge(
-        df_utilizacao, df_hh, how="inner", on="key_id"
+        df_utilizacao, df_hh, how="inner", on=keys
     )
-    df_final = pd.merge(df_interme, df_utl_tah, how="left", on="key_id")
+    df_final = pd.merge(df_interme, df_utl_tah, how="left", on=keys)
     df_final = df_final[
         ["Dep._Date", "A/C", "Hours_dec", "TAH_dec", "Cycles", "HH"]
     ].copy()
     df_final.columns = ["date", "acft", "sum_daily_hours", "age_fleet", "Cycles", "HH"]
     df_final["HH"] = df_final["HH"].fillna(0)
+    return df_final
+
 
-    # Média de utilização mensal (soma no mês) para join depois
+def _monthly(df_final: pd.DataFrame) -> pd.DataFrame:
+    """Utilização mensal (soma no mês), com key_2 = YYYYMM para join."""
     df_avg_um = df_final.groupby(pd.Grouper(key="date", freq="M")).agg(
         {"sum_daily_hours": "sum"}
     ).reset_index()
     df_avg_um = df_avg_um.rename(columns={"sum_daily_hours": "sum_uti_mensal"})
     df_avg_um["key_2"] = df_avg_um["date"].dt.strftime("%Y%m")
+    return df_avg_um
 
-    # Agregação semanal
-    df_final_group = df_final.groupby(pd.Grouper(key="date", freq="7D")).agg(
+
+def _weekly(df_final: pd.DataFrame, origin: pd.Timestamp) -> pd.DataFrame:
+    """Agregação em buckets de 7 dias ancorados em origin, já com sum_uti_mensal."""
+    df_avg_um = _monthly(df_final)
+
+    df_final_group = df_final.groupby(pd.Grouper(key="date", freq="7D", origin=origin)).agg(
         {
             "acft": "count",
             "sum_daily_hours": "sum",
@@ -63,9 +91,125 @@ def run(
 
     # Reordenar colunas: date, acft, sum_daily_hours, age_fleet, Cycles, sum_uti_mensal, HH
     cols = ["date", "acft", "sum_daily_hours", "age_fleet", "Cycles", "sum_uti_mensal", "HH"]
-    df_final_group = df_final_group[[c for c in cols if c in df_final_group.columns]]
+    return df_final_group[[c for c in cols if c in df_final_group.columns]]
+
+
+def _week_floor(ts: pd.Timestamp, origin: pd.Timestamp) -> pd.Timestamp:
+    return origin + ((ts - origin) // WEEK) * WEEK
+
+
+def _watermark(df_final: pd.DataFrame, origin: pd.Timestamp, min_date: str) -> dict:
+    """Ponto de retomada do modo incremental: origem dos buckets e última semana completa."""
+    max_date = df_final["date"].max()
+    last_complete = _week_floor(max_date + pd.Timedelta(days=1), origin) - WEEK
+    return {
+        "origin": origin.isoformat(),
+        "max_date": max_date.isoformat(),
+        "last_complete_week": last_complete.isoformat(),
+        "min_date": str(min_date),
+    }
+
+
+def load_watermark(path) -> dict | None:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_watermark(path, watermark: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(watermark, f, indent=2)
+
+
+def run(
+    df_hh: pd.DataFrame,
+    df_utilizacao: pd.DataFrame,
+    df_utl_tah: pd.DataFrame,
+    min_date: str = "2014-12-31",
+    return_watermark: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, dict]:
+    """
+    df_hh: colunas CLOSING_DATE, AC, HH
+    df_utilizacao: Dep._Date, A/C, Hours_dec, Cycles
+    df_utl_tah: Dep._Date, A/C, Hours_dec, TAH_dec
+    Faz merge por (date, AC), depois agregação semanal e merge com sum_uti_mensal.
+    Com return_watermark=True retorna também o watermark para o próximo run_incremental.
+    """
+    df_final = _join_daily(df_hh, df_utilizacao, df_utl_tah)
+
+    # Buckets de 7 dias começam no primeiro dia com dados (mesmo que o default do Grouper)
+    origin = df_final["date"].min().normalize()
+    df_final_group = _weekly(df_final, origin)
 
     # Filtro de data (corrige bug do notebook que usava df_final em vez de df_final_group)
     df_final_group = df_final_group.loc[df_final_group["date"] > min_date]
 
+    if return_watermark:
+        return df_final_group, _watermark(df_final, origin, min_date)
     return df_final_group
+
+
+def run_incremental(
+    df_hh: pd.DataFrame,
+    df_utilizacao: pd.DataFrame,
+    df_utl_tah: pd.DataFrame,
+    previous: pd.DataFrame,
+    watermark: dict,
+    min_date: str = "2014-12-31",
+    lookback_days: int = 14,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Atualiza o dataset semanal anterior recalculando só a cauda.
+    - Recalcula as semanas a partir da última semana completa do watermark, recuando
+      lookback_days (OS fechadas com atraso caem em semanas já publicadas).
+    - Só os eventos/utilização a partir do início do mês dessa semana entram no join:
+      é o mínimo para recalcular sum_uti_mensal do mês afetado.
+    - Semanas anteriores são mantidas; as do mês afetado recebem o sum_uti_mensal novo.
+    - Sem dados no recorte, o dataset anterior e o watermark voltam inalterados.
+    O recorte vale só para o join e a agregação: ingestão, HH e utilização (Etapas 1-3)
+    continuam lendo e agregando o histórico inteiro quando suas entradas mudam.
+    Retorna (dataset completo, novo watermark).
+    """
+    origin = pd.Timestamp(watermark["origin"])
+    last_complete = pd.Timestamp(watermark["last_complete_week"])
+    keep_from = _week_floor(last_complete + WEEK - pd.Timedelta(days=lookback_days), origin)
+    month_from = keep_from.to_period("M").start_time
+
+    df_hh = df_hh.loc[pd.to_datetime(df_hh["CLOSING_DATE"]) >= month_from]
+    df_utilizacao = df_utilizacao.loc[pd.to_datetime(df_utilizacao["Dep._Date"]) >= month_from]
+    df_utl_tah = df_utl_tah.loc[pd.to_datetime(df_utl_tah["Dep._Date"]) >= month_from]
+    df_final = _join_daily(df_hh, df_utilizacao, df_utl_tah)
+
+    if df_final.empty:
+        return previous, watermark
+    previous = previous.copy()
+    previous["date"] = pd.to_datetime(previous["date"])
+    kept = previous.loc[previous["date"] < keep_from]
+
+    df_new = _weekly(df_final, origin)
+    df_new = df_new.loc[df_new["date"] >= keep_from]
+    # Semanas sem nenhum dado entre o histórico e o primeiro dado novo (o Grouper só
+    # cria buckets a partir do primeiro dado do recorte)
+    if not df_new.empty:
+        semanas = pd.date_range(keep_from, df_new["date"].max(), freq=WEEK)
+        faltando = semanas.difference(df_new["date"])
+        if len(faltando):
+            vazias = pd.DataFrame({"date": faltando})
+            vazias["key_2"] = vazias["date"].dt.strftime("%Y%m")
+            vazias = pd.merge(vazias, _monthly(df_final)[["key_2", "sum_uti_mensal"]], how="left", on="key_2")
+            for c in ["acft", "sum_daily_hours", "age_fleet", "Cycles", "HH"]:
+                vazias[c] = 0 if c == "acft" else 0.0
+            df_new = pd.concat([df_new, vazias[df_new.columns]]).sort_values("date")
+
+    # sum_uti_mensal das semanas mantidas que caem no mês recalculado
+    df_avg_um = _monthly(df_final).set_index("key_2")["sum_uti_mensal"]
+    kept = kept.copy()
+    key_2 = kept["date"].dt.strftime("%Y%m")
+    afetadas = key_2.isin(df_avg_um.index)
+    kept.loc[afetadas, "sum_uti_mensal"] = key_2[afetadas].map(df_avg_um)
+
+    df_new = df_new.loc[df_new["date"] > min_date]
+    result = pd.concat([kept, df_new[kept.columns]], ignore_index=True)
+    return result, _watermark(df_final, origin, min_date)
@@ -0,0 +1,88 @@
+"""
+Cache por arquivo (Parquet) dos DataFrames lidos dos Excel/CSV brutos.
+A chave de cada entrada combina caminho, tamanho, mtime e o esquema de leitura
+(colunas usadas); qualquer mudança em um deles invalida a entrada.
+O cache grava o DataFrame como recebeu: quem lê normaliza antes (schema.text_if_mixed), para
+que a leitura com e sem cache dê os mesmos dados.
+"""
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+# Incrementar quando o formato das entradas mudar (invalida o cache inteiro)
+CACHE_VERSION = 1
+
+
+def _parquet_disponivel() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def schema_fingerprint(*partes) -> str:
+    """Hash curto do esquema de leitura (ex.: COLS_OLD, USECOLS) + versão do cache."""
+    payload = json.dumps([CACHE_VERSION, *partes], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class FrameCache:
+    """Cache de DataFrames por arquivo de origem, gravado em <root>/<namespace>/."""
+
+    def __init__(self, root, namespace: str, schema: str):
+        self.dir = Path(root) / namespace
+        self.schema = schema
+        self.enabled = _parquet_disponivel()
+        if not self.enabled:
+            print("  Aviso: pyarrow não instalado; cache de leitura desativado.")
+
+    def _paths(self, f: Path) -> tuple[str, Path]:
+        f = Path(f).resolve()
+        st = f.stat()
+        prefixo = hashlib.sha1(str(f).encode("utf-8")).hexdigest()[:16]
+        versao = hashlib.sha1(
+            f"{st.st_size}:{st.st_mtime_ns}:{self.schema}".encode("utf-8")
+        ).hexdigest()[:16]
+        return prefixo, self.dir / f"{prefixo}_{versao}.parquet"
+
+    def get(self, f: Path) -> pd.DataFrame | None:
+        """Retorna o DataFrame em cache para o arquivo, ou None se ausente/desatualizado."""
+        if not self.enabled:
+            return None
+        _, entry = self._paths(f)
+        if not entry.exists():
+            return None
+        try:
+            return pd.read_parquet(entry)
+        except Exception:
+            # Entrada corrompida (ex.: execução interrompida): relê o arquivo original
+            entry.unlink(missing_ok=True)
+            return None
+
+    def put(self, f: Path, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Grava a entrada do arquivo e remove versões antigas do mesmo arquivo. Colunas object
+        com tipos misturados não cabem em Parquet: normalize antes com schema.text_if_mixed.
+        """
+        if not self.enabled:
+            return df
+        prefixo, entry = self._paths(f)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for antigo in self.dir.glob(f"{prefixo}_*.parquet"):
+            if antigo != entry:
+                antigo.unlink(missing_ok=True)
+        tmp = entry.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        tmp.replace(entry)
+        return df
+
+
+def purge(root) -> None:
+    """Apaga todo o cache de leitura."""
+    root = Path(root)
+    if root.exists():
+        shutil.rmtree(root)
@@ -0,0 +1,187 @@
+"""
+Executor das etapas da pipeline como um grafo (DAG).
+Cada etapa declara dependências, entradas externas (arquivos/pastas), artefatos de saída,
+a seção de config que a afeta e os módulos de código que usa. O fingerprint disso tudo
+(mais o das dependências) é comparado com o da última execução bem-sucedida: se nada
+mudou e os artefatos existem, a etapa é pulada e só recarregada se alguém precisar dela.
+Etapas independentes (ex.: cadeia Unscheduled x cadeia Utilização) rodam em paralelo.
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Callable
+
+
+@dataclass
+class Stage:
+    name: str
+    description: str
+    run: Callable[[dict], dict]
+    load: Callable[[], dict] | None = None
+    deps: list[str] = field(default_factory=list)
+    inputs: list[Path] = field(default_factory=list)
+    outputs: list[Path] = field(default_factory=list)
+    config: dict = field(default_factory=dict)
+    code: list[ModuleType] = field(default_factory=list)
+
+
+@dataclass
+class StageReport:
+    name: str
+    description: str
+    status: str  # "executada" | "reaproveitada" | "pulada"
+    seconds: float = 0.0
+
+
+def _path_stats(p: Path) -> list:
+    """Assinatura barata de um arquivo/pasta: nome, tamanho e mtime (sem ler o conteúdo)."""
+    p = Path(p)
+    if not p.exists():
+        return [str(p), "ausente"]
+    if p.is_file():
+        st = p.stat()
+        return [str(p), st.st_size, st.st_mtime_ns]
+    arquivos = sorted(f for f in p.iterdir() if f.is_file())
+    return [str(p)] + [[f.name, f.stat().st_size, f.stat().st_mtime_ns] for f in arquivos]
+
+
+def _code_hash(modules: list[ModuleType]) -> str:
+    h = hashlib.sha1()
+    for m in modules:
+        h.update(Path(m.__file__).read_bytes())
+    return h.hexdigest()
+
+
+def fingerprints(stages: list[Stage]) -> dict[str, str]:
+    """Fingerprint de cada etapa, em ordem topológica (inclui os das dependências)."""
+    out = {}
+    for st in stages:
+        payload = {
+            "config": st.config,
+            "inputs": [_path_stats(p) for p in st.inputs],
+            "deps": [out[d] for d in st.deps],
+            "code": _code_hash(st.code),
+        }
+        raw = json.dumps(payload, sort_keys=True, default=str)
+        out[st.name] = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return out
+
+
+def _check_order(stages: list[Stage]) -> None:
+    vistos = set()
+    for st in stages:
+        faltando = [d for d in st.deps if d not in vistos]
+        if faltando:
+            raise ValueError(f"Etapa '{st.name}' depende de {faltando}, que não vêm antes dela.")
+        vistos.add(st.name)
+
+
+def run_stages(
+    stages: list[Stage],
+    state_path: Path,
+    force: bool = False,
+    reuse: set[str] | None = None,
+    max_workers: int = 2,
+) -> tuple[dict, list[StageReport]]:
+    """
+    Executa as etapas (lista em ordem topológica).
+    force: ignora fingerprints e roda tudo.
+    reuse: etapas que devem ser recarregadas dos artefatos mesmo com fingerprint diferente.
+    Retorna (saídas de todas as etapas executadas/carregadas, relatório por etapa).
+    O estado (fingerprints) só é gravado se todas as etapas terminarem sem erro.
+    """
+    _check_order(stages)
+    reuse = reuse or set()
+    by_name = {st.name: st for st in stages}
+    fps = fingerprints(stages)
+
+    state = {}
+    if state_path.exists() and not force:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+
+    pular = set()
+    for st in stages:
+        artefatos_ok = st.load is not None and all(Path(p).exists() for p in st.outputs)
+        if st.name in reuse:
+            if not artefatos_ok:
+                raise FileNotFoundError(
+                    f"Etapa '{st.name}' marcada para reaproveitar, mas faltam artefatos: "
+                    f"{[str(p) for p in st.outputs if not Path(p).exists()]}"
+                )
+            pular.add(st.name)
+        elif not force and artefatos_ok and state.get(st.name) == fps[st.name]:
+            pular.add(st.name)
+
+    results: dict[str, dict] = {}
+    reports = {
+        st.name: StageReport(st.name, st.description, "pulada" if st.name in pular else "pendente")
+        for st in stages
+    }
+    locks = {st.name: threading.Lock() for st in stages}
+
+    def outputs_of(name: str) -> dict:
+        # Etapas puladas só são lidas do disco se alguma etapa executada precisar delas
+        with locks[name]:
+            if name not in results:
+                t0 = time.perf_counter()
+                results[name] = by_name[name].load()
+                reports[name].status = "reaproveitada"
+                reports[name].seconds = time.perf_counter() - t0
+            return results[name]
+
+    def execute(st: Stage) -> None:
+        ctx = {}
+        for d in st.deps:
+            ctx.update(outputs_of(d))
+        print(f"{st.description}...")
+        t0 = time.perf_counter()
+        out = st.run(ctx) or {}
+        with locks[st.name]:
+            results[st.name] = out
+            reports[st.name].status = "executada"
+            reports[st.name].seconds = time.perf_counter() - t0
+
+    for st in stages:
+        if st.name in pular:
+            print(f"{st.description}: sem mudanças, reaproveitando artefatos.")
+
+    pendentes = [st for st in stages if st.name not in pular]
+    concluidas = set(pular)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        rodando = {}
+        while pendentes or rodando:
+            for st in list(pendentes):
+                if all(d in concluidas for d in st.deps):
+                    rodando[pool.submit(execute, st)] = st
+                    pendentes.remove(st)
+            if not rodando:
+                break
+            prontos, _ = wait(rodando, return_when=FIRST_COMPLETED)
+            for fut in prontos:
+                st = rodando.pop(fut)
+                fut.result()  # propaga o erro da etapa (o estado não é gravado)
+                concluidas.add(st.name)
+
+    # Etapas reaproveitadas à força não foram validadas contra as entradas atuais
+    novo_estado = {n: (state.get(n) if n in reuse else fp) for n, fp in fps.items()}
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({n: fp for n, fp in novo_estado.items() if fp}, f, indent=2)
+
+    merged = {}
+    for name in results:
+        merged.update(results[name])
+    return merged, [reports[st.name] for st in stages]
+
+
+def print_summary(reports: list[StageReport]) -> None:
+    print("Resumo das etapas:")
+    for r in reports:
+        tempo = f"{r.seconds:8.2f}s" if r.status != "pulada" else " " * 9
+        print(f"  {r.name:<14} {tempo}  {r.status}")
@@ -0,0 +1,82 @@
+"""
+Conversão vetorizada de durações 'HH:MM' para horas decimais.
+Usada por process_unscheduled_hh (HH planejado/executado) e process_utilization (Hours, TAH).
+"""
+import numpy as np
+import pandas as pd
+
+# Strings maiores que isso vão para o caminho lento (evita matriz larga por causa de 1 valor)
+_MAX_WIDTH = 16
+_ZERO, _NINE, _COLON = ord("0"), ord("9"), ord(":")
+
+
+def _split_to_decimal(s: pd.Series) -> pd.Series:
+    """Implementação original (split + to_numeric); referência de semântica e fallback."""
+    parts = s.str.split(":", expand=True)
+    h = pd.to_numeric(parts[0], errors="coerce").fillna(0)
+    if parts.shape[1] < 2:
+        m = 0
+    else:
+        m = pd.to_numeric(parts[1], errors="coerce").fillna(0)
+    return h + (m * 100 / 60) / 100
+
+
+def hhmm_to_decimal(series: pd.Series) -> pd.Series:
+    """
+    Converte coluna no formato 'HH:MM' ou similar para decimal (horas).
+    Mesma semântica de str.split(":") + pd.to_numeric(errors="coerce").fillna(0):
+    - 'H:MM' -> H + MM/60; só as duas primeiras partes contam ('1:30:00' -> 1.5)
+    - sem ':' na linha ('1.5', 'nan') -> número da parte única, ou 0 se inválido
+    - sem ':' em nenhuma linha -> pd.to_numeric(series, errors="coerce") (mantém NaN)
+    Linhas só com dígitos e no máximo um ':' são convertidas direto dos code points
+    (sem criar colunas intermediárias); o resto usa a implementação original.
+    """
+    s = series.astype(str)
+    values = s.to_numpy(dtype=str)
+    n = len(values)
+    if n == 0:
+        return pd.to_numeric(series, errors="coerce")
+
+    lens = np.char.str_len(values)
+    curto = lens <= _MAX_WIDTH
+    width = min(values.dtype.itemsize // 4, _MAX_WIDTH)
+    codes = values[curto].astype(f"<U{max(width, 1)}").view(np.uint32).reshape(-1, max(width, 1))
+    lens_c = lens[curto]
+
+    is_digit = (codes >= _ZERO) & (codes <= _NINE)
+    is_colon = codes == _COLON
+    n_colon = is_colon.sum(axis=1)
+    colon_pos = np.where(n_colon > 0, is_colon.argmax(axis=1), lens_c)
+    col = np.arange(codes.shape[1])
+    dentro = col[None, :] < lens_c[:, None]
+
+    # Rápido: só dígitos e um ':' opcional, com dígitos dos dois lados
+    rapido = (
+        ((is_digit | is_colon) | ~dentro).all(axis=1)
+        & (n_colon <= 1)
+        & (colon_pos > 0)
+        & ((n_colon == 0) | (colon_pos < lens_c - 1))
+    )
+
+    has_colon = bool(n_colon.any()) or any(":" in v for v in values[~curto])
+    if not has_colon:
+        return pd.to_numeric(series, errors="coerce")
+
+    h = np.zeros(len(codes), dtype=np.int64)
+    m = np.zeros(len(codes), dtype=np.int64)
+    digitos = codes.astype(np.int64) - _ZERO
+    for j in range(codes.shape[1]):
+        em_h = is_digit[:, j] & (j < colon_pos)
+        em_m = is_digit[:, j] & (j > colon_pos)
+        h = np.where(em_h, h * 10 + digitos[:, j], h)
+        m = np.where(em_m, m * 10 + digitos[:, j], m)
+
+    out = np.empty(n, dtype=np.float64)
+    idx_curto = np.flatnonzero(curto)
+    out[idx_curto] = h.astype(np.float64) + (m.astype(np.float64) * 100 / 60) / 100
+
+    lento = np.ones(n, dtype=bool)
+    lento[idx_curto[rapido]] = False
+    if lento.any():
+        out[lento] = _split_to_decimal(s[lento]).to_numpy(dtype=np.float64)
+    return pd.Series(out, index=series.index)
@@ -2,12 +2,18 @@
 Ingestão e consolidação dos dados de Unscheduled Items (Excel).
 Suporta dois formatos: pasta 'all' (colunas antigas) e pasta '2021' (colunas novas).
 """
-import os
+import multiprocessing
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import pandas as pd
 
+from pipeline import schema
+from pipeline.cache import FrameCache, schema_fingerprint
+from pipeline.process_unscheduled_hh import target_mask
+
 
 # Colunas antigas (all) -> mapeamento para nome canônico
 COLS_OLD = [
@@ -26,23 +32,103 @@ CANONICAL = [
 ]
 
 
-def _read_dir_excel(diretorio: str, usecols: list, encoding: str = "utf-8") -> pd.DataFrame:
-    """Lê todos os .xlsx/.xls de um diretório e concatena."""
+def _read_excel_file(f: Path, usecols: list, dtype: dict | None = None) -> tuple[pd.DataFrame, float]:
+    """
+    Lê um único workbook e retorna (DataFrame, segundos gastos). Roda também em processo filho.
+    O dtype (category) é aplicado depois de normalizar colunas de tipos misturados: com
+    dtype= no read_excel, uma coluna com int e str (ex.: ATA) quebra ao ordenar as categorias.
+    """
+    warnings.simplefilter("ignore", category=UserWarning)
+    t0 = time.perf_counter()
+    try:
+        df = schema.text_if_mixed(pd.read_excel(f, usecols=usecols))
+        if dtype:
+            # Categorias com o dtype inferido (ex.: int64 para ATA numérica), o mesmo que volta do cache
+            df = df.astype({c: t for c, t in dtype.items() if c in df.columns})
+    except Exception as e:
+        raise RuntimeError(f"Erro ao ler {f}: {e}") from e
+    return df, time.perf_counter() - t0
+
+
+def _filter_rows(df: pd.DataFrame, ac_type_filter: str | None = None) -> pd.DataFrame:
+    """
+    Filtros aplicados a cada workbook logo após a leitura (antes do concat e do drop_duplicates,
+    com o mesmo resultado: são filtros por linha): sem PILOT/CABIN e, com ac_type_filter,
+    só o tipo de aeronave e fora das ATA excluídas (mesmo filtro de process_unscheduled_hh).
+    """
+    mask = None
+    if "SIGN" in df.columns:
+        mask = ~df["SIGN"].isin(["PILOT", "CABIN"]).to_numpy(dtype=bool)
+    if ac_type_filter is not None:
+        alvo = target_mask(df, ac_type_filter)
+        mask = alvo if mask is None else mask & alvo
+    return df if mask is None else df.loc[mask]
+
+
+def _read_dir_excel(
+    diretorio: str,
+    usecols: list,
+    encoding: str = "utf-8",
+    workers: int = 1,
+    cache: FrameCache | None = None,
+    dtype: dict | None = None,
+    ac_type_filter: str | None = None,
+) -> pd.DataFrame:
+    """
+    Lê todos os .xlsx/.xls de um diretório e concatena.
+    Com workers > 1 os workbooks são lidos em paralelo (pool de processos); a ordem do
+    concat segue sempre o nome do arquivo, independente de qual termina primeiro.
+    Com cache, só os arquivos novos ou modificados são lidos do Excel (o cache guarda o
+    workbook inteiro; os filtros de _filter_rows vêm depois).
+    """
     path = Path(diretorio)
     if not path.exists():
         return pd.DataFrame()
-    lista = []
-    warnings.simplefilter("ignore", category=UserWarning)
-    for f in path.iterdir():
-        if f.suffix.lower() in (".xlsx", ".xls"):
-            try:
-                df = pd.read_excel(f, usecols=usecols)
-                lista.append(df)
-            except Exception as e:
-                raise RuntimeError(f"Erro ao ler {f}: {e}") from e
-    if not lista:
+    arquivos = sorted(
+        (f for f in path.iterdir() if f.suffix.lower() in (".xlsx", ".xls")),
+        key=lambda f: f.name,
+    )
+    if not arquivos:
         return pd.DataFrame()
-    return pd.concat(lista, ignore_index=True)
+
+    warnings.simplefilter("ignore", category=UserWarning)
+    resultados = {}
+    if cache is not None:
+        for f in arquivos:
+            df = cache.get(f)
+            if df is not None:
+                resultados[f] = (df, None)
+    pendentes = [f for f in arquivos if f not in resultados]
+
+    if workers > 1 and len(pendentes) > 1:
+        # spawn: a pipeline pode rodar etapas em threads, e fork com threads ativas pode travar
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(pendentes)), mp_context=ctx) as pool:
+            futures = {pool.submit(_read_excel_file, f, usecols, dtype): f for f in pendentes}
+            for fut in as_completed(futures):
+                f = futures[fut]
+                try:
+                    resultados[f] = fut.result()
+                except RuntimeError:
+                    raise
+                except Exception as e:
+                    # Falhas do próprio pool (ex.: worker morto) também identificam o arquivo
+                    raise RuntimeError(f"Erro ao ler {f}: {e}") from e
+    else:
+        for f in pendentes:
+            resultados[f] = _read_excel_file(f, usecols, dtype)
+
+    lista = []
+    for f in arquivos:
+        df, elapsed = resultados[f]
+        if elapsed is None:
+            print(f"    {f.name}: {len(df)} linhas (cache)")
+        else:
+            if cache is not None:
+                cache.put(f, df)
+            print(f"    {f.name}: {len(df)} linhas em {elapsed:.2f}s")
+        lista.append(_filter_rows(df, ac_type_filter))
+    return schema.concat_frames(lista)
 
 
 def _normalize_2021(df: pd.DataFrame) -> pd.DataFrame:
@@ -80,19 +166,42 @@ def run(
     dir_all: str,
     dir_2021: str,
     encoding: str = "ISO-8859-1",
+    workers: int = 1,
+    cache_dir: str | None = None,
+    lean_dtypes: bool = True,
+    ac_type_filter: str | None = None,
 ) -> pd.DataFrame:
     """
     Lê as duas pastas (all e 2021), unifica esquema e retorna um único DataFrame.
-    Filtra linhas SIGN in ['PILOT','CABIN'] e remove coluna SIGN.
+    Filtra linhas SIGN in ['PILOT','CABIN'] (em cada workbook, antes do concat) e remove coluna SIGN.
+    ac_type_filter: se informado, já descarta na leitura as linhas de outros tipos de aeronave
+    e das ATA excluídas (só quando a média de imputação do HH é sobre as linhas filtradas).
+    workers: nº de processos para ler os Excel em paralelo (1 = sequencial).
+    cache_dir: se informado, cada Excel lido fica em cache (Parquet) até mudar.
+    lean_dtypes: aplica pipeline.schema (category/datas) já na leitura.
     """
     dfs = []
 
-    df_all = _read_dir_excel(dir_all, usecols=COLS_OLD, encoding=encoding)
+    dtype_old = schema.read_dtypes(schema.UNSCHEDULED_OLD_READ) if lean_dtypes else None
+    dtype_2021 = schema.read_dtypes(schema.UNSCHEDULED_2021_READ) if lean_dtypes else None
+
+    cache_all = cache_2021 = None
+    if cache_dir:
+        cache_all = FrameCache(cache_dir, "unscheduled_all", schema_fingerprint(COLS_OLD, dtype_old))
+        cache_2021 = FrameCache(cache_dir, "unscheduled_2021", schema_fingerprint(COLS_2021, dtype_2021))
+
+    df_all = _read_dir_excel(
+        dir_all, usecols=COLS_OLD, encoding=encoding, workers=workers, cache=cache_all, dtype=dtype_old,
+        ac_type_filter=ac_type_filter,
+    )
     if not df_all.empty:
         df_all = _normalize_old(df_all)
         dfs.append(df_all)
 
-    df_2021 = _read_dir_excel(dir_2021, usecols=COLS_2021, encoding=encoding)
+    df_2021 = _read_dir_excel(
+        dir_2021, usecols=COLS_2021, encoding=encoding, workers=workers, cache=cache_2021, dtype=dtype_2021,
+        ac_type_filter=ac_type_filter,
+    )
     if not df_2021.empty:
         df_2021 = _normalize_2021(df_2021)
         dfs.append(df_2021)
@@ -103,12 +212,14 @@ def run(
             "Verifique config.yaml (unscheduled_all, unscheduled_2021)."
         )
 
-    consolidado = pd.concat(dfs, ignore_index=True)
+    consolidado = schema.concat_frames(dfs)
     consolidado = consolidado.drop_duplicates()
 
-    # Filtrar PILOT e CABIN
+    # PILOT e CABIN já saíram em _filter_rows
     if "SIGN" in consolidado.columns:
-        consolidado = consolidado.loc[~consolidado["SIGN"].isin(["PILOT", "CABIN"])]
         consolidado = consolidado.drop(columns=["SIGN"])
 
+    if lean_dtypes:
+        consolidado = schema.apply(consolidado, schema.UNSCHEDULED)
+
     return consolidado
@@ -2,38 +2,75 @@
 Limpeza e agregação dos Unscheduled Items: tratamento de HH, filtros (B737NG, ATA),
 agregação por data e prefixo (AC).
 """
+import time
+
+import numpy as np
 import pandas as pd
 
+from pipeline.durations import hhmm_to_decimal as _hh_to_decimal
+
+EXCLUDED_ATA = ["ADMINISTRATIVE - GENERAL"]
+# Base da média usada no lugar de HH == 0: todas as linhas (comportamento original) ou só as do filtro
+IMPUTE_SCOPES = ("all", "filtered")
+# HH com mais caracteres que isso é inválido (> 24h vira texto de data no Excel)
+MAX_HH_LEN = 8
+
+
+def target_mask(df: pd.DataFrame, ac_type_filter: str) -> np.ndarray:
+    """
+    Linhas do tipo ac_type_filter fora de EXCLUDED_ATA. Aceita os nomes canônicos e os dos
+    Excel brutos (formato antigo e 2021), para a ingestão aplicar o mesmo filtro na leitura.
+    """
+    ac_col = next((c for c in ("AC_Type", "AC Type") if c in df.columns), None)
+    if ac_col is None:
+        raise ValueError("Coluna de tipo de aeronave não encontrada.")
+    mask = (df[ac_col] == ac_type_filter).to_numpy(dtype=bool, na_value=False)
+    ata_desc_col = next((c for c in ("ATA_DESC", "ATA DESC", "DESCRIPTION") if c in df.columns), None)
+    if ata_desc_col is not None:
+        mask &= ~df[ata_desc_col].isin(EXCLUDED_ATA).to_numpy(dtype=bool)
+    return mask
+
 
-def _hh_to_decimal(series: pd.Series) -> pd.Series:
-    """Converte coluna no formato 'HH:MM' ou similar para decimal (horas)."""
-    parts = series.astype(str).str.split(":", expand=True)
-    if parts.shape[1] < 2:
-        return pd.to_numeric(series, errors="coerce")
-    h = pd.to_numeric(parts[0], errors="coerce").fillna(0)
-    m = pd.to_numeric(parts[1], errors="coerce").fillna(0)
-    return h + (m * 100 / 60) / 100
+def _hh_codes(series: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Códigos por linha e texto de cada valor distinto (como astype(str)).
+    HH se repete muito ('1:30', '0:45'...): o texto é montado e medido uma vez por valor.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    texto = pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+    return codes, texto
+
+
+def _decimal(codes: np.ndarray, texto: pd.Series, linhas: np.ndarray) -> np.ndarray:
+    """HH decimal das linhas pedidas, convertendo só os valores distintos que aparecem nelas."""
+    presentes = np.flatnonzero(np.bincount(codes[linhas], minlength=len(texto)))
+    dec = np.zeros(len(texto), dtype=np.float64)
+    dec[presentes] = _hh_to_decimal(texto.iloc[presentes]).to_numpy(dtype=np.float64)
+    return dec[codes[linhas]]
 
 
-def run(df_uns: pd.DataFrame, ac_type_filter: str = "B737NG") -> pd.DataFrame:
+def run(df_uns: pd.DataFrame, ac_type_filter: str = "B737NG", impute_scope: str = "all") -> pd.DataFrame:
     """
     Recebe o DataFrame consolidado de Unscheduled (já com colunas canônicas).
     - Normaliza nomes de colunas (espaços -> _)
-    - Converte CLOSING_DATE para datetime
+    - Filtra AC_Type == ac_type_filter e exclui ATA_DESC == 'ADMINISTRATIVE - GENERAL' primeiro
+      (máscara sobre colunas categóricas); o resto só processa as linhas do filtro
     - Filtra HH_* com len <= 8 (evita valores tipo '1900-01-01...')
-    - Converte HH planejado/executado para decimal; onde HH executado == 0 usa planejado; depois substitui 0 pela média
-    - Filtra AC_Type == ac_type_filter
-    - Exclui ATA_DESC == 'ADMINISTRATIVE - GENERAL'
+    - Converte HH planejado/executado para decimal (uma vez por valor distinto); onde HH
+      executado == 0 usa planejado; depois substitui 0 pela média
+    - impute_scope: 'all' = média sobre todas as linhas com HH válido (como antes do filtro,
+      comportamento original); 'filtered' = média só das linhas do filtro
     - Mantém conjuntos maiores (motor, APU, trem de pouso)
     - Agrupa por CLOSING_DATE e AC, soma HH.
     Retorna DataFrame com colunas: CLOSING_DATE, AC, HH.
     """
-    df = df_uns.copy()
-    df.columns = df.columns.str.replace(" ", "_")
+    if impute_scope not in IMPUTE_SCOPES:
+        raise ValueError(f"hh_impute_scope inválido: {impute_scope}. Use um de {IMPUTE_SCOPES}.")
+    t0 = time.perf_counter()
+    df = df_uns.rename(columns=lambda c: c.replace(" ", "_"))
 
     if "CLOSING_DATE" not in df.columns:
         raise ValueError("DataFrame deve conter coluna CLOSING_DATE")
-    df["CLOSING_DATE"] = pd.to_datetime(df["CLOSING_DATE"])
 
     # Colunas de HH podem ter nomes ligeiramente diferentes
     col_exec = None
@@ -46,34 +83,39 @@ def run(df_uns: pd.DataFrame, ac_type_filter: str = "B737NG") -> pd.DataFrame:
     if col_exec is None or col_plan is None:
         raise ValueError("Colunas de HH Executado e Planejado não encontradas.")
 
+    alvo = target_mask(df, ac_type_filter)
+    total = len(df)
+    if impute_scope == "filtered":
+        df = df.loc[alvo]
+        alvo = np.ones(len(df), dtype=bool)
+
     # Filtrar linhas com HH em formato inválido (> 24h gera string longa)
-    df[col_exec] = df[col_exec].astype(str)
-    df[col_plan] = df[col_plan].astype(str)
-    df = df[df[col_exec].str.len() <= 8]
-    df = df[df[col_plan].str.len() <= 8]
-
-    df["HH_Planejado_dec"] = _hh_to_decimal(df[col_plan])
-    df["HH_Executado_dec"] = _hh_to_decimal(df[col_exec])
-    df["HH"] = df["HH_Executado_dec"]
-    df.loc[df["HH_Executado_dec"] == 0, "HH"] = df["HH_Planejado_dec"]
-    avg = df["HH"].replace(0, pd.NA).mean()
-    if pd.isna(avg):
-        avg = df["HH"].mean()
-    df["HH"] = df["HH"].replace(0, avg)
+    codes_exec, texto_exec = _hh_codes(df[col_exec])
+    codes_plan, texto_plan = _hh_codes(df[col_plan])
+    valido = (texto_exec.str.len().to_numpy() <= MAX_HH_LEN)[codes_exec]
+    valido &= (texto_plan.str.len().to_numpy() <= MAX_HH_LEN)[codes_plan]
+    linhas = np.flatnonzero(valido)
 
-    # Filtro por tipo de aeronave
-    ac_col = "AC_Type" if "AC_Type" in df.columns else "AC Type"
-    if ac_col not in df.columns:
-        raise ValueError("Coluna de tipo de aeronave não encontrada.")
-    df = df.loc[df[ac_col] == ac_type_filter]
+    hh_exec = _decimal(codes_exec, texto_exec, linhas)
+    hh_plan = _decimal(codes_plan, texto_plan, linhas)
+    hh = pd.Series(np.where(hh_exec == 0, hh_plan, hh_exec))
+    avg = hh.replace(0, pd.NA).mean()
+    if pd.isna(avg):
+        avg = hh.mean()
 
-    # Excluir ADMINISTRATIVE - GENERAL
-    ata_desc_col = "ATA_DESC" if "ATA_DESC" in df.columns else "ATA DESC"
-    if ata_desc_col in df.columns:
-        df = df.loc[~df[ata_desc_col].isin(["ADMINISTRATIVE - GENERAL"])]
+    no_filtro = alvo[linhas]
+    linhas = linhas[no_filtro]
+    hh = hh[no_filtro].replace(0, avg).to_numpy()
 
     # Manter apenas colunas necessárias para agregação (conjuntos maiores = não excluir motor/APU/trem)
-    df = df[["CLOSING_DATE", "AC", "HH"]].copy()
-    df_ng_agrupado = df.groupby(["CLOSING_DATE", "AC"], as_index=False).agg({"HH": "sum"})
+    df = pd.DataFrame({
+        "CLOSING_DATE": pd.to_datetime(df["CLOSING_DATE"].iloc[linhas]).reset_index(drop=True),
+        "AC": df["AC"].iloc[linhas].reset_index(drop=True),
+        "HH": hh,
+    })
+    df_ng_agrupado = df.groupby(["CLOSING_DATE", "AC"], as_index=False, observed=True).agg({"HH": "sum"})
 
+    print(f"  HH: {len(linhas):,} de {total:,} linhas no filtro ({ac_type_filter}, sem {EXCLUDED_ATA[0]}); "
+          f"{len(texto_exec) + len(texto_plan):,} valores distintos de HH convertidos "
+          f"(média de imputação: {impute_scope}) em {time.perf_counter() - t0:.2f}s")
     return df_ng_agrupado
@@ -4,69 +4,233 @@ Ingestão e processamento da base de utilização de aeronaves (CSV).
 import warnings
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+from pandas.util import hash_pandas_object
+
+from pipeline import schema
+from pipeline.cache import FrameCache, schema_fingerprint
+from pipeline.durations import hhmm_to_decimal
 
 
 USECOLS = ["Dep. Date", "A/C", "AC-Type", "# per Day", "Hours", "Cycles", "TAH", "TAC"]
 
 
-def _read_utilization_dir(diretorio: str) -> pd.DataFrame:
+def _read_utilization_dir(
+    diretorio: str,
+    cache: FrameCache | None = None,
+    lean_dtypes: bool = True,
+) -> pd.DataFrame:
     path = Path(diretorio)
     if not path.exists():
         return pd.DataFrame()
     lista = []
-    for f in path.iterdir():
+    for f in sorted(path.iterdir(), key=lambda f: f.name):
         if f.suffix.lower() == ".csv":
-            try:
-                df = pd.read_csv(f, usecols=USECOLS, encoding="utf-8", on_bad_lines="skip")
-                lista.append(df)
-            except Exception as e:
-                raise RuntimeError(f"Erro ao ler {f}: {e}") from e
+            df = cache.get(f) if cache is not None else None
+            if df is None:
+                try:
+                    df = pd.read_csv(
+                        f, usecols=USECOLS, encoding="utf-8", on_bad_lines="skip",
+                        dtype=schema.read_dtypes(schema.UTILIZATION_READ) if lean_dtypes else None,
+                    )
+                except Exception as e:
+                    raise RuntimeError(f"Erro ao ler {f}: {e}") from e
+                if lean_dtypes:
+                    df = schema.apply(df, schema.UTILIZATION_READ)
+                df = schema.text_if_mixed(df)
+                if cache is not None:
+                    cache.put(f, df)
+            lista.append(df)
     if not lista:
         return pd.DataFrame()
-    return pd.concat(lista, ignore_index=True).drop_duplicates()
+    return schema.concat_frames(lista).drop_duplicates()
+
+
+def _date_text(s: pd.Series) -> pd.Series:
+    """Datas do export vêm como 'YYYY.MM.DD'."""
+    return s.astype(str).str.replace(".", "-")
+
+
+def _clean_utilization(df: pd.DataFrame) -> pd.DataFrame:
+    """Limpeza linha a linha: datas, Hours/TAH em decimal e Cycles numérico."""
+    df.columns = df.columns.str.replace(" ", "_")
+    # Datas e horas podem vir como category (schema): as conversões rodam só nas categorias
+    if "Cycles" in df.columns and df["Cycles"].dtype == object:
+        # Só os textos têm aspas; números vindos de outros arquivos (após o concat) ficam como estão
+        texto = df["Cycles"].str.replace("'", "", regex=False)
+        df["Cycles"] = texto.where(texto.notna(), df["Cycles"])
+    df = df.loc[schema.map_categories(df["Dep._Date"], lambda s: _date_text(s) != "0 ")]
+    df["Dep._Date"] = schema.map_categories(df["Dep._Date"], lambda s: pd.to_datetime(_date_text(s)))
+    df = df.dropna(subset=["Hours"])
+
+    # Hours e TAH no formato HH:MM -> decimal
+    df["Hours_dec"] = schema.map_categories(df["Hours"], hhmm_to_decimal)
+    df["TAH_dec"] = schema.map_categories(df["TAH"], hhmm_to_decimal)
 
+    df = df.drop(columns=["Hours", "TAC"], errors="ignore")
+    df["Cycles"] = pd.to_numeric(df["Cycles"], errors="coerce").fillna(1)
+    return df
 
-def run(diretorio: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash de 64 bits por linha (valores, não dtypes): números viram float64 antes do hash
+    para que '1' lido como int num bloco e float em outro conte como a mesma linha.
+    """
+    norm = df.copy(deep=False)
+    for c in norm.columns:
+        if pd.api.types.is_numeric_dtype(norm[c].dtype) and not pd.api.types.is_bool_dtype(norm[c].dtype):
+            norm[c] = norm[c].astype("float64")
+    return hash_pandas_object(norm, index=False).to_numpy()
+
+
+class _SeenHashes:
+    """
+    Hashes de linha já vistos (drop_duplicates entre blocos e arquivos), em blocos ordenados
+    de tamanho decrescente: cada bloco novo é fundido com os menores até ficar menor que o
+    anterior. Ficam O(log n) blocos e cada hash é fundido O(log n) vezes, em vez de reordenar
+    o conjunto inteiro a cada bloco. Ocupa 8 bytes por linha distinta: é a parte da memória
+    que cresce com o histórico (o drop_duplicates da leitura inteira é global).
+    """
+
+    def __init__(self):
+        self.runs: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(r.size for r in self.runs)
+
+    def contains(self, h: np.ndarray) -> np.ndarray:
+        achados = np.zeros(h.size, dtype=bool)
+        for r in self.runs:
+            pos = np.minimum(np.searchsorted(r, h), r.size - 1)
+            achados |= r[pos] == h
+        return achados
+
+    def add(self, h: np.ndarray) -> None:
+        if not h.size:
+            return
+        run = np.sort(h)
+        while self.runs and self.runs[-1].size <= run.size:
+            # Duas sequências ordenadas: o sort estável (timsort) as junta em tempo linear
+            run = np.concatenate([self.runs.pop(), run])
+            run.sort(kind="stable")
+        self.runs.append(run)
+
+
+def _partial_agg(df: pd.DataFrame) -> pd.DataFrame:
+    return df.groupby(["Dep._Date", "A/C"], observed=True).agg(
+        {"Hours_dec": "sum", "Cycles": "sum", "TAH_dec": "max"}
+    ).reset_index()
+
+
+def _merge_partials(parciais: list[pd.DataFrame], ac_dtype=None) -> pd.DataFrame:
+    df = schema.concat_frames(parciais)
+    if ac_dtype is not None:
+        df["A/C"] = pd.Categorical(df["A/C"].astype(object), dtype=ac_dtype)
+    return _partial_agg(df)
+
+
+def _run_streaming(
+    diretorio: str,
+    chunksize: int,
+    lean_dtypes: bool = True,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Lê cada CSV em blocos de chunksize linhas, limpa e agrega cada bloco (soma de Hours_dec
+    e Cycles, máximo de TAH_dec) e junta os agregados parciais. Em memória ficam só o bloco
+    atual, os agregados (do tamanho da saída) e um hash de 8 bytes por linha para o
+    drop_duplicates entre arquivos (_SeenHashes: cresce com as linhas distintas do histórico,
+    ~17 MB para 2,2M linhas). Não usa o cache de leitura (que guarda arquivos inteiros).
+    Resultado igual ao de run() sem chunksize; somas de um mesmo dia/prefixo espalhadas em
+    blocos diferentes podem diferir no último dígito (ordem da soma em ponto flutuante).
+    """
+    path = Path(diretorio)
+    arquivos = sorted(
+        (f for f in path.iterdir() if f.suffix.lower() == ".csv"), key=lambda f: f.name
+    ) if path.exists() else []
+    if not arquivos:
+        raise FileNotFoundError(
+            f"Nenhum CSV encontrado em {diretorio}. Verifique config (utilization_dir)."
+        )
+
+    vistos = _SeenHashes()
+    parciais = []
+    em_parciais = 0
+    # Ordem das categorias de A/C igual à da leitura inteira: ordenadas por arquivo, unidas em sequência
+    ordem_ac = pd.Index([])
+    for f in arquivos:
+        ac_arquivo = set()
+        try:
+            leitor = pd.read_csv(
+                f, usecols=USECOLS, encoding="utf-8", on_bad_lines="skip", chunksize=chunksize,
+                dtype=schema.read_dtypes(schema.UTILIZATION_READ) if lean_dtypes else None,
+            )
+            for bloco in leitor:
+                h = _row_hashes(bloco)
+                novas = ~pd.Series(h).duplicated().to_numpy()
+                novas &= ~vistos.contains(h)
+                vistos.add(h[novas])
+                bloco = bloco[novas]
+                if lean_dtypes:
+                    ac_arquivo.update(bloco["A/C"].cat.categories)
+                if bloco.empty:
+                    continue
+                parcial = _partial_agg(_clean_utilization(bloco))
+                parciais.append(parcial)
+                em_parciais += len(parcial)
+                # Compacta os parciais para não crescerem com o número de blocos
+                if len(parciais) > 1 and em_parciais > chunksize:
+                    parciais = [_merge_partials(parciais)]
+                    em_parciais = len(parciais[0])
+        except Exception as e:
+            raise RuntimeError(f"Erro ao ler {f}: {e}") from e
+        ordem_ac = ordem_ac.append(pd.Index(sorted(ac_arquivo))).unique()
+
+    if not parciais:
+        raise FileNotFoundError(
+            f"Nenhum CSV encontrado em {diretorio}. Verifique config (utilization_dir)."
+        )
+    ac_dtype = pd.CategoricalDtype(ordem_ac) if lean_dtypes else None
+    df = _merge_partials(parciais, ac_dtype)
+    return df[["Dep._Date", "A/C", "Hours_dec", "Cycles"]], df[["Dep._Date", "A/C", "Hours_dec", "TAH_dec"]]
+
+
+def run(
+    diretorio: str,
+    cache_dir: str | None = None,
+    lean_dtypes: bool = True,
+    chunksize: int | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Lê todos os CSV do diretório de utilização, limpa e agrega.
+    cache_dir: se informado, cada CSV lido fica em cache (Parquet) até mudar.
+    lean_dtypes: aplica pipeline.schema (A/C como category etc.) já na leitura.
+    chunksize: se informado, processa os CSV em blocos (memória limitada pelo bloco, ver _run_streaming).
     Retorna:
       - df_utilizacao: agrupado por Dep._Date e A/C com Hours_dec (sum), Cycles (sum)
       - df_utl_tah: agrupado por Dep._Date e A/C com Hours_dec (sum), TAH_dec (max) para idade da frota
     """
-    df = _read_utilization_dir(diretorio)
+    if chunksize:
+        return _run_streaming(diretorio, chunksize, lean_dtypes=lean_dtypes)
+
+    cache = None
+    if cache_dir:
+        cache = FrameCache(
+            cache_dir, "utilization", schema_fingerprint(USECOLS, lean_dtypes and schema.UTILIZATION_READ)
+        )
+    df = _read_utilization_dir(diretorio, cache=cache, lean_dtypes=lean_dtypes)
     if df.empty:
         raise FileNotFoundError(
             f"Nenhum CSV encontrado em {diretorio}. Verifique config (utilization_dir)."
         )
-
-    df.columns = df.columns.str.replace(" ", "_")
-    df["Dep._Date"] = df["Dep._Date"].astype(str).str.replace(".", "-")
-    if "Cycles" in df.columns and df["Cycles"].dtype == object:
-        df["Cycles"] = df["Cycles"].str.replace("'", "", regex=False)
-    df = df.loc[df["Dep._Date"] != "0 "]
-    df["Dep._Date"] = pd.to_datetime(df["Dep._Date"])
-    df = df.dropna(subset=["Hours"])
-
-    # Hours e TAH no formato HH:MM -> decimal
-    h = df["Hours"].astype(str).str.split(":", expand=True)
-    df["Hours_h"] = pd.to_numeric(h[0], errors="coerce").fillna(0)
-    df["Hours_m"] = pd.to_numeric(h[1], errors="coerce").fillna(0)
-    df["Hours_dec"] = df["Hours_h"] + (df["Hours_m"] * 100 / 60) / 100
-
-    tah = df["TAH"].astype(str).str.split(":", expand=True)
-    df["TAH_h"] = pd.to_numeric(tah[0], errors="coerce").fillna(0)
-    df["TAH_m"] = pd.to_numeric(tah[1], errors="coerce").fillna(0)
-    df["TAH_dec"] = df["TAH_h"] + (df["TAH_m"] * 100 / 60) / 100
-
-    df = df.drop(columns=["Hours", "Hours_h", "Hours_m", "TAH_h", "TAH_m", "TAC"], errors="ignore")
-    df["Cycles"] = pd.to_numeric(df["Cycles"], errors="coerce").fillna(1)
+    df = _clean_utilization(df)
 
     # Agregação por dia e prefixo
-    df_hd = df.groupby(["Dep._Date", "A/C"]).agg(
+    df_hd = df.groupby(["Dep._Date", "A/C"], observed=True).agg(
         {"Hours_dec": "sum", "Cycles": "sum"}
     ).reset_index()
-    df_tah = df.groupby(["Dep._Date", "A/C"]).agg(
+    df_tah = df.groupby(["Dep._Date", "A/C"], observed=True).agg(
         {"Hours_dec": "sum", "TAH_dec": "max"}
     ).reset_index()
 
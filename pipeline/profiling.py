@@ -0,0 +1,174 @@
+"""
+Perfil por etapa da pipeline (run_data_pipeline.py --profile).
+Para cada etapa executada: tempo de parede, CPU do processo e dos filhos (workers de
+ingestão), pico de RSS durante a etapa (amostrado), linhas e bytes dos DataFrames que entram
+e saem e cada artefato gravado (pipeline.artifacts.write). Opcionalmente grava um .prof
+(cProfile) e um snapshot do tracemalloc por etapa. O relatório é um JSON para comparar
+execuções. As medições são do processo inteiro: o modo perfil roda as etapas em sequência.
+"""
+import cProfile
+import json
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from pipeline import artifacts
+from pipeline.resources import RssSampler, current_rss_mb
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _children_cpu() -> float:
+    if resource is None:
+        return 0.0
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+def frame_stats(frames: dict) -> dict:
+    """Linhas e bytes (memory_usage deep) de cada DataFrame de um dict de saídas/entradas."""
+    out = {}
+    for name, obj in frames.items():
+        if isinstance(obj, pd.DataFrame):
+            out[name] = {
+                "rows": int(len(obj)),
+                "columns": int(obj.shape[1]),
+                "bytes": int(obj.memory_usage(index=True, deep=True).sum()),
+            }
+    return out
+
+
+def file_stats(paths: list) -> dict:
+    """Nº de arquivos e bytes das entradas externas de uma etapa (arquivos ou pastas)."""
+    arquivos = []
+    for p in paths or []:
+        p = Path(p)
+        if p.is_file():
+            arquivos.append(p)
+        elif p.is_dir():
+            arquivos.extend(f for f in p.iterdir() if f.is_file())
+    return {"files": len(arquivos), "bytes": sum(f.stat().st_size for f in arquivos)}
+
+
+class PipelineProfiler:
+    def __init__(self, out_dir: Path, cprofile: bool = False, trace_memory: bool = False):
+        self.out_dir = Path(out_dir)
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._current = threading.local()
+        self._t0 = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+
+    def _on_write(self, path: Path, rows: int, seconds: float) -> None:
+        stage = getattr(self._current, "stage", None)
+        if stage is not None:
+            self.stages[stage]["writes"].append({
+                "path": str(path),
+                "rows": rows,
+                "bytes": path.stat().st_size if path.exists() else None,
+                "seconds": round(seconds, 4),
+            })
+
+    def wrap(self, name: str, run, input_paths: list | None = None):
+        """Envolve Stage.run com as medições (input_paths = Stage.inputs, arquivos brutos lidos)."""
+
+        def profiled(ctx: dict) -> dict:
+            rec = {
+                "input_files": file_stats(input_paths),
+                "inputs": frame_stats(ctx),
+                "writes": [],
+            }
+            self.stages[name] = rec
+            self._current.stage = name
+            sampler = RssSampler()
+            prof = cProfile.Profile() if self.cprofile else None
+            if self.trace_memory:
+                tracemalloc.start()
+            rec["rss_start_mb"] = current_rss_mb()
+            sampler.start()
+            cpu0, filhos0, t0 = time.process_time(), _children_cpu(), time.perf_counter()
+            if prof is not None:
+                prof.enable()
+            try:
+                out = run(ctx)
+            finally:
+                if prof is not None:
+                    prof.disable()
+                rec["wall_s"] = round(time.perf_counter() - t0, 4)
+                rec["cpu_s"] = round(time.process_time() - cpu0, 4)
+                rec["cpu_children_s"] = round(_children_cpu() - filhos0, 4)
+                rec["peak_rss_mb"] = sampler.stop()
+                rec["rss_end_mb"] = current_rss_mb()
+                self._current.stage = None
+                self.out_dir.mkdir(parents=True, exist_ok=True)
+                if prof is not None:
+                    prof_path = self.out_dir / f"{name}.prof"
+                    prof.dump_stats(prof_path)
+                    rec["cprofile"] = str(prof_path)
+                if self.trace_memory:
+                    snap = tracemalloc.take_snapshot()
+                    rec["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+                    tracemalloc.stop()
+                    snap_path = self.out_dir / f"{name}.tracemalloc"
+                    snap.dump(str(snap_path))
+                    rec["tracemalloc"] = str(snap_path)
+                    rec["top_allocations"] = [
+                        {"where": str(s.traceback[0]), "mb": round(s.size / 2**20, 3), "count": s.count}
+                        for s in snap.statistics("lineno")[:10]
+                    ]
+            rec["outputs"] = frame_stats(out or {})
+            return out
+
+        return profiled
+
+    def __enter__(self):
+        artifacts.add_write_listener(self._on_write)
+        return self
+
+    def __exit__(self, *exc):
+        artifacts.remove_write_listener(self._on_write)
+        return False
+
+    def report(self, reports: list) -> dict:
+        """Relatório final; reports = StageReport de run_stages (status de cada etapa)."""
+        etapas = []
+        for r in reports:
+            etapas.append({"name": r.name, "status": r.status, **self.stages.get(r.name, {})})
+        return {
+            "started_at": self.started_at,
+            "total_wall_s": round(time.perf_counter() - self._t0, 4),
+            "stages": etapas,
+        }
+
+    def save(self, reports: list) -> Path:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / "pipeline_profile.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(reports), f, indent=2)
+        return path
+
+
+def print_profile(report: dict) -> None:
+    print("Perfil das etapas:")
+    print(f"  {'etapa':<14} {'parede':>8} {'CPU':>8} {'CPU filhos':>10} {'pico RSS':>9} "
+          f"{'lido':>9} {'linhas entr.':>13} {'linhas saída':>13} {'gravado':>10}")
+    for st in report["stages"]:
+        if "wall_s" not in st:
+            print(f"  {st['name']:<14} {st['status']}")
+            continue
+        entrada = sum(v["rows"] for v in st["inputs"].values())
+        saida = sum(v["rows"] for v in st["outputs"].values())
+        gravado = sum(w["bytes"] or 0 for w in st["writes"])
+        pico = f"{st['peak_rss_mb']:.0f} MB" if st.get("peak_rss_mb") is not None else "-"
+        lido = st["input_files"]["bytes"] / 2**20
+        print(f"  {st['name']:<14} {st['wall_s']:>7.2f}s {st['cpu_s']:>7.2f}s {st['cpu_children_s']:>9.2f}s "
+              f"{pico:>9} {lido:>7.1f}MB {entrada:>13,} {saida:>13,} {gravado / 2**20:>8.1f}MB")
+    print(f"  total {report['total_wall_s']:.2f}s")
@@ -0,0 +1,100 @@
+"""
+Medição de memória do processo (RSS atual e pico), sem dependências obrigatórias.
+Linux/macOS usam resource e /proc; no Windows é preciso ter psutil instalado.
+peak_rss_mb é o pico acumulado do processo (ru_maxrss): para o pico de uma etapa use
+RssSampler, que amostra o RSS só enquanto a etapa roda.
+"""
+import os
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _psutil_process():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process()
+
+
+def peak_rss_mb() -> float | None:
+    """Pico de RSS do processo até agora, em MB (None se não for possível medir)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta em KB, macOS em bytes
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    proc = _psutil_process()
+    if proc is None:
+        return None
+    info = proc.memory_info()
+    return getattr(info, "peak_wset", info.rss) / 2**20
+
+
+def current_rss_mb() -> float | None:
+    """RSS atual do processo, em MB (None se não for possível medir)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    proc = _psutil_process()
+    if proc is None:
+        return None
+    return proc.memory_info().rss / 2**20
+
+
+class RssSampler:
+    """Pico de RSS entre start() e stop(), amostrado a cada interval segundos."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_mb = None
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> None:
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self.start_mb = current_rss_mb()
+        self._sample()
+        self._thread = threading.Thread(target=self._loop, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> float | None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return self.peak
+
+
+def format_stage_mem(sampler: RssSampler) -> str:
+    """Resumo de uma etapa: RSS no fim, pico durante a etapa e quanto ele subiu desde o início."""
+    atual = current_rss_mb()
+    if sampler.peak is None or atual is None:
+        return format_mem()
+    return (f"RSS {atual:.0f} MB, pico na etapa {sampler.peak:.0f} MB "
+            f"(+{sampler.peak - sampler.start_mb:.0f} MB desde o início da etapa)")
+
+
+def format_mem() -> str:
+    """Resumo para os prints da pipeline: RSS atual e pico."""
+    atual, pico = current_rss_mb(), peak_rss_mb()
+    if pico is None:
+        return "memória indisponível (instale psutil)"
+    if atual is None:
+        return f"pico RSS {pico:.0f} MB"
+    return f"RSS {atual:.0f} MB, pico {pico:.0f} MB"
@@ -0,0 +1,147 @@
+"""
+Política de dtypes por etapa da pipeline.
+- Colunas textuais de baixa cardinalidade (prefixo, tipo, estação, ATA) -> category.
+- Texto muito repetido que ainda será convertido (datas e horas da utilização) -> category;
+  a conversão roda uma vez por categoria (map_categories).
+- Datas -> datetime64 na leitura.
+- Inteiros que não entram em contas (ex.: '# per Day') -> menor tipo inteiro sem perda.
+Horas, HH e Cycles continuam float64: entram nas somas do dataset final e float32
+mudaria os valores gravados.
+"""
+import numpy as np
+import pandas as pd
+
+# Leitura dos Excel de Unscheduled (nomes originais de cada formato)
+UNSCHEDULED_OLD_READ = {
+    "category": ["SIGN", "AC", "AC Type", "ISSUE STATION", "ATA", "ATA DESC"],
+}
+UNSCHEDULED_2021_READ = {
+    "category": ["SIGN", "AC", "AC_Type", "ISSUE_STATION", "ATA", "DESCRIPTION"],
+}
+# Consolidado (bd_unscheduled_itens), nomes canônicos
+UNSCHEDULED = {
+    "category": ["AC", "AC_Type", "ISSUE_Station", "ATA", "ATA_DESC"],
+    "dates": ["CLOSING_DATE"],
+}
+# Leitura dos CSV de utilização
+UTILIZATION_READ = {
+    "category": ["Dep. Date", "A/C", "AC-Type", "Hours"],
+    "downcast": ["# per Day"],
+}
+# HH agregado por dia e prefixo (bd_hh_agrupado)
+HH_AGG = {
+    "category": ["AC"],
+    "dates": ["CLOSING_DATE"],
+}
+# Agregados de utilização (bd_utilização_agrupado, bd_utl_tah)
+UTILIZATION_AGG = {
+    "category": ["A/C"],
+    "dates": ["Dep._Date"],
+}
+
+# Dataset semanal final
+DATASET = {
+    "dates": ["date"],
+}
+
+
+def read_dtypes(schema: dict) -> dict:
+    """dtype= para pd.read_csv / pd.read_excel."""
+    return {c: "category" for c in schema.get("category", [])}
+
+
+def read_kwargs(schema: dict) -> dict:
+    """dtype= e parse_dates= para pd.read_csv (floats relidos sem perda do que foi gravado)."""
+    kwargs = {"dtype": read_dtypes(schema), "float_precision": "round_trip"}
+    if schema.get("dates"):
+        kwargs["parse_dates"] = list(schema["dates"])
+    return kwargs
+
+
+def apply(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Aplica o schema às colunas presentes (as ausentes são ignoradas)."""
+    for c in schema.get("category", []):
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    for c in schema.get("dates", []):
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c])
+    for c in schema.get("downcast", []):
+        if c in df.columns and pd.api.types.is_integer_dtype(df[c].dtype):
+            df[c] = pd.to_numeric(df[c], downcast="integer")
+    return df
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    pd.concat que preserva colunas category: sem isso, categorias diferentes entre
+    arquivos viram object no resultado.
+    """
+    frames = [f for f in frames if not f.empty] or frames
+    if len(frames) > 1:
+        comuns = [
+            c for c in frames[0].columns
+            if all(c in f.columns and isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames)
+        ]
+        mistas = []
+        if comuns:
+            frames = [f.copy(deep=False) for f in frames]
+            for c in comuns:
+                tipos = {f[c].cat.categories.dtype for f in frames}
+                if len(tipos) > 1:
+                    # Categorias de tipos diferentes entre arquivos (ex.: ATA int e str)
+                    mistas.append(c)
+                    for f in frames:
+                        f[c] = f[c].astype(object)
+                    continue
+                # Um único dtype para todos os frames: o concat não precisa comparar categorias
+                uniao = pd.Index(np.concatenate([f[c].cat.categories.to_numpy() for f in frames])).unique()
+                dtype = pd.CategoricalDtype(uniao)
+                for f in frames:
+                    recode = np.append(uniao.get_indexer(f[c].cat.categories), -1)
+                    f[c] = pd.Categorical.from_codes(recode[f[c].cat.codes.to_numpy()], dtype=dtype)
+        df = pd.concat(frames, ignore_index=True)
+        for c in mistas:
+            df[c] = df[c].astype("category")
+        return df
+    return pd.concat(frames, ignore_index=True)
+
+
+def text_if_mixed(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas object (ou category) com tipos misturados (ex.: datetime.time e str nas colunas de
+    HH do Excel, ATA int e str) viram texto, que é a mesma representação usada depois
+    (astype(str)). Nulos continuam nulos. Aplicado em toda leitura dos brutos, com ou sem
+    cache: o Parquet (cache e artefatos) não grava colunas de tipos misturados.
+    """
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            cats = s.cat.categories
+            if cats.dtype == object and len(cats.map(type).unique()) > 1:
+                s = s.astype(object)
+                df[col] = s.where(s.isna(), s.astype(str)).astype("category")
+            continue
+        if s.dtype != object:
+            continue
+        tipos = s.dropna().map(type).unique()
+        if len(tipos) > 1:
+            df[col] = s.where(s.isna(), s.astype(str))
+    return df
+
+
+def map_categories(series: pd.Series, func) -> pd.Series:
+    """
+    Aplica uma conversão elemento a elemento (func: Series -> Series) só nas categorias
+    distintas e expande pelos códigos. Nulos recebem func(NaN), como no caminho normal.
+    Para séries que não são category, equivale a func(series).
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return func(series)
+    # Só as categorias em uso: as de linhas já filtradas (ex.: data '0 ') podem nem converter
+    series = series.cat.remove_unused_categories()
+    cats = series.cat.categories
+    valores = func(pd.Series(list(cats) + [float("nan")], dtype=object))
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes < 0, len(cats), codes)
+    return pd.Series(valores.to_numpy()[codes], index=series.index)
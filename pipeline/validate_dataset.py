@@ -1,38 +1,344 @@
 """
-Validação básica do dataset final (schema, nulos, faixas).
+Validação do dataset final por regras declarativas (data_pipeline.validation_rules no config).
+Cada regra: {column, check, severity (error | warning), ...parâmetros do check}.
+Checks:
+- not_null: sem nulos.
+- range: min e/ou max (inclusive); datas aceitam 'YYYY-MM-DD'.
+- unique: sem valores repetidos.
+- continuity: diferença fixa entre linhas consecutivas (freq, ex.: '7D' para os buckets semanais).
+- monotonic: não decrescente (strict: true = estritamente crescente).
+- outlier: |z| > z (padrão 4) com média e desvio da coluna inteira.
+As regras são avaliadas numa só passada: cada coluna vira array uma vez por bloco e todos os
+checks dela rodam vetorizados em cima do mesmo array. No modo em blocos (validate_file com
+chunksize) unique/continuity/monotonic carregam estado entre blocos; outlier precisa da média
+e do desvio globais, então uma leitura só das colunas com outlier vem antes.
+Erros reprovam a pipeline; avisos só são impressos.
 """
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+import numpy as np
 import pandas as pd
 
+from pipeline import artifacts
+from pipeline import schema as _schema
+
 REQUIRED_COLUMNS = [
     "date", "acft", "sum_daily_hours", "age_fleet", "Cycles", "sum_uti_mensal", "HH"
 ]
+DEFAULT_RULES = [
+    {"column": "date", "check": "not_null"},
+    {"column": "HH", "check": "not_null"},
+    {"column": "HH", "check": "range", "min": 0},
+    {"column": "acft", "check": "range", "min": 0},
+    {"column": "date", "check": "unique"},
+    {"column": "date", "check": "continuity", "freq": "7D"},
+    {"column": "HH", "check": "outlier", "z": 4, "severity": "warning"},
+]
+SEVERITIES = ("error", "warning")
+SAMPLE_SIZE = 5
+
+
+@dataclass
+class ValidationResult:
+    """Resultado de uma regra: linhas que a violam e até SAMPLE_SIZE exemplos (linha, valor)."""
+
+    column: str
+    check: str
+    severity: str
+    rows: int
+    message: str
+    sample: list = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.rows == 0
+
+    def to_dict(self) -> dict:
+        return {"column": self.column, "check": self.check, "severity": self.severity,
+                "rows": self.rows, "message": self.message, "sample": self.sample}
+
+
+def _scalar(v):
+    """Valor de amostra serializável em JSON (NaN/NaT -> None)."""
+    if pd.isna(v):
+        return None
+    if isinstance(v, np.datetime64):
+        return str(pd.Timestamp(v))
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def _bound(value, values: np.ndarray):
+    """Limite da regra no tipo da coluna (datas do config chegam como texto)."""
+    if values.dtype.kind == "M":
+        return np.datetime64(pd.Timestamp(value), "ns")
+    return float(value)
+
+
+class _Check(ABC):
+    needs_stats = False
+
+    def __init__(self, rule: dict):
+        self.column = rule["column"]
+        self.check = rule["check"]
+        self.severity = rule.get("severity", "error")
+        self.rule = rule
+        self.rows = 0
+        self.sample = []
+
+    def _flag(self, mask: np.ndarray, values: np.ndarray, offset: int) -> None:
+        idx = np.flatnonzero(mask)
+        self.rows += len(idx)
+        for i in idx[:SAMPLE_SIZE - len(self.sample)]:
+            self.sample.append({"row": int(offset + i), "value": _scalar(values[i])})
+
+    @abstractmethod
+    def update(self, values: np.ndarray, offset: int) -> None:
+        """Avalia um bloco da coluna; offset = posição da 1ª linha do bloco no dataset."""
+
+    @abstractmethod
+    def describe(self) -> str:
+        """Trecho da mensagem com a regra violada (ex.: 'contém nulos')."""
+
+    def result(self) -> ValidationResult:
+        msg = f"Coluna '{self.column}' {self.describe()} ({self.rows} linhas)."
+        if self.sample:
+            msg += " Ex.: " + ", ".join(f"linha {s['row']} = {s['value']}" for s in self.sample)
+        return ValidationResult(self.column, self.check, self.severity, self.rows, msg, list(self.sample))
+
+
+class _NotNull(_Check):
+    def update(self, values, offset):
+        self._flag(pd.isna(values), values, offset)
+
+    def describe(self):
+        return "contém nulos"
+
+
+class _Range(_Check):
+    def update(self, values, offset):
+        mask = np.zeros(len(values), dtype=bool)
+        if self.rule.get("min") is not None:
+            mask |= values < _bound(self.rule["min"], values)
+        if self.rule.get("max") is not None:
+            mask |= values > _bound(self.rule["max"], values)
+        self._flag(mask, values, offset)
+
+    def describe(self):
+        lo, hi = self.rule.get("min"), self.rule.get("max")
+        if hi is None and isinstance(lo, (int, float)) and lo == 0:
+            return "contém valores negativos"
+        return f"fora da faixa [{'-inf' if lo is None else lo}, {'inf' if hi is None else hi}]"
+
+
+class _Unique(_Check):
+    """Repetição = valor já visto antes (no bloco ou em blocos anteriores); a 1ª ocorrência não conta."""
+
+    def __init__(self, rule):
+        super().__init__(rule)
+        self._seen = None  # valores únicos já vistos (ordenados)
+
+    def update(self, values, offset):
+        keys = values.view("i8") if values.dtype.kind == "M" else values
+        # Ordenação estável: entre valores iguais a 1ª ocorrência fica na frente
+        order = np.argsort(keys, kind="stable")
+        ordenadas = keys[order]
+        repetida = ordenadas[1:] == ordenadas[:-1]
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[order[1:][repetida]] = True
+        uniq = ordenadas[np.concatenate([[True], ~repetida])] if len(keys) else ordenadas
+        if self._seen is not None and len(self._seen):
+            pos = np.minimum(np.searchsorted(self._seen, keys), len(self._seen) - 1)
+            mask |= self._seen[pos] == keys
+            self._seen = np.sort(np.concatenate([self._seen, uniq]), kind="stable")
+        else:
+            self._seen = uniq
+        self._flag(mask, values, offset)
+
+    def describe(self):
+        return "contém valores repetidos"
+
+
+class _Continuity(_Check):
+    """Linha cujo valor não é o anterior + freq (buraco ou fora de ordem)."""
+
+    def __init__(self, rule):
+        super().__init__(rule)
+        self._last = None
 
+    def update(self, values, offset):
+        if len(values) == 0:
+            return
+        step = pd.Timedelta(self.rule["freq"]).to_timedelta64() if values.dtype.kind == "M" else self.rule["freq"]
+        prev = np.concatenate([values[:1] if self._last is None else [self._last], values[:-1]])
+        mask = (values - prev) != step
+        if self._last is None:
+            mask[0] = False
+        self._last = values[-1]
+        self._flag(mask, values, offset)
 
-def run(df: pd.DataFrame, required_columns: list[str] | None = None) -> list[str]:
+    def describe(self):
+        return f"sem intervalo fixo de {self.rule['freq']} entre linhas consecutivas"
+
+
+class _Monotonic(_Check):
+    def __init__(self, rule):
+        super().__init__(rule)
+        self._last = None
+
+    def update(self, values, offset):
+        if len(values) == 0:
+            return
+        prev = np.concatenate([values[:1] if self._last is None else [self._last], values[:-1]])
+        mask = values <= prev if self.rule.get("strict") else values < prev
+        if self._last is None:
+            mask[0] = False
+        self._last = values[-1]
+        self._flag(mask, values, offset)
+
+    def describe(self):
+        return "não é estritamente crescente" if self.rule.get("strict") else "não é crescente"
+
+
+class _Outlier(_Check):
+    needs_stats = True
+
+    def __init__(self, rule):
+        super().__init__(rule)
+        self.z = float(rule.get("z", 4))
+        self.mean = self.std = None
+
+    def update(self, values, offset):
+        if not self.std:
+            return
+        x = values.astype(np.float64, copy=False)
+        with np.errstate(invalid="ignore"):
+            mask = np.abs(x - self.mean) > self.z * self.std
+        self._flag(mask, values, offset)
+
+    def describe(self):
+        return f"com outliers (|z| > {self.z:g})"
+
+
+CHECKS = {
+    "not_null": _NotNull,
+    "range": _Range,
+    "unique": _Unique,
+    "continuity": _Continuity,
+    "monotonic": _Monotonic,
+    "outlier": _Outlier,
+}
+
+
+def _make_checks(rules: list[dict]) -> list[_Check]:
+    checks = []
+    for rule in rules:
+        if rule.get("check") not in CHECKS:
+            raise ValueError(f"Regra de validação inválida: {rule}. Checks: {list(CHECKS)}.")
+        if rule.get("severity", "error") not in SEVERITIES:
+            raise ValueError(f"Severidade inválida em {rule}. Use uma de {SEVERITIES}.")
+        checks.append(CHECKS[rule["check"]](rule))
+    return checks
+
+
+def _moments(chunks, columns: set) -> dict:
+    """Média e desvio (populacional) por coluna, somando n, soma e soma dos quadrados por bloco."""
+    acc = {c: [0, 0.0, 0.0] for c in columns}
+    for chunk in chunks:
+        for c in columns:
+            x = chunk[c].to_numpy(dtype=np.float64, na_value=np.nan)
+            x = x[np.isfinite(x)]
+            a = acc[c]
+            a[0] += len(x)
+            a[1] += x.sum()
+            a[2] += np.square(x).sum()
+    out = {}
+    for c, (n, s, s2) in acc.items():
+        mean = s / n if n else None
+        out[c] = (mean, float(np.sqrt(max(s2 / n - mean * mean, 0.0))) if n else None)
+    return out
+
+
+def _evaluate(chunk_source, columns: list[str], rules: list[dict] | None,
+              required_columns: list[str] | None) -> list[ValidationResult]:
     """
-    Valida o DataFrame do dataset semanal.
-    Retorna lista de mensagens de erro (vazia se tudo ok).
+    chunk_source(cols) devolve um iterável de DataFrames com as colunas cols (um só bloco
+    no modo em memória). columns = colunas disponíveis.
     """
-    errors = []
     required = required_columns or REQUIRED_COLUMNS
+    faltando = [c for c in required if c not in columns]
+    if faltando:
+        return [ValidationResult(c, "required", "error", 0, f"Coluna obrigatória ausente: {c}")
+                for c in faltando]
+
+    checks = _make_checks(DEFAULT_RULES if rules is None else rules)
+    results = []
+    presentes = []
+    for ch in checks:
+        if ch.column in columns:
+            presentes.append(ch)
+        else:
+            results.append(ValidationResult(ch.column, ch.check, ch.severity, 0,
+                                            f"Coluna '{ch.column}' da regra {ch.check} não existe no dataset."))
+    stat_cols = {ch.column for ch in presentes if ch.needs_stats}
+    if stat_cols:
+        stats = _moments(chunk_source(sorted(stat_cols)), stat_cols)
+        for ch in presentes:
+            if ch.needs_stats:
+                ch.mean, ch.std = stats[ch.column]
+
+    por_coluna = {}
+    for ch in presentes:
+        por_coluna.setdefault(ch.column, []).append(ch)
+    total = 0
+    for chunk in chunk_source(sorted(por_coluna)):
+        for col, col_checks in por_coluna.items():
+            values = chunk[col].to_numpy()
+            for ch in col_checks:
+                ch.update(values, total)
+        total += len(chunk)
+
+    results = [ch.result() for ch in presentes] + results
+    if total == 0:
+        results.append(ValidationResult("", "not_empty", "error", 1, "Dataset está vazio após filtros."))
+    return results
+
+
+def validate(df: pd.DataFrame, rules: list[dict] | None = None,
+             required_columns: list[str] | None = None) -> list[ValidationResult]:
+    """Avalia as regras (padrão DEFAULT_RULES) no DataFrame; um resultado por regra."""
+    return _evaluate(lambda cols: [df[cols]], list(df.columns), rules, required_columns)
+
 
-    for col in required:
-        if col not in df.columns:
-            errors.append(f"Coluna obrigatória ausente: {col}")
+def validate_file(path, rules: list[dict] | None = None, required_columns: list[str] | None = None,
+                  chunksize: int | None = None) -> list[ValidationResult]:
+    """
+    Valida um artefato (parquet/feather/csv) em blocos de chunksize linhas, lendo só as
+    colunas das regras; sem chunksize lê o arquivo inteiro.
+    """
+    if not chunksize:
+        return validate(artifacts.read(path, schema=_schema.DATASET), rules, required_columns)
+    header = next(artifacts.iter_chunks(path, 1, schema=_schema.DATASET), None)
+    if header is None:
+        return validate(artifacts.read(path, schema=_schema.DATASET), rules, required_columns)
+    return _evaluate(
+        lambda cols: artifacts.iter_chunks(path, chunksize, columns=cols, schema=_schema.DATASET),
+        list(header.columns), rules, required_columns,
+    )
+
+
+def errors(results: list[ValidationResult]) -> list[str]:
+    return [r.message for r in results if not r.ok and r.severity == "error"]
 
-    if errors:
-        return errors
 
-    if df["date"].isna().any():
-        errors.append("Coluna 'date' contém nulos.")
-    if df["HH"].isna().any():
-        errors.append("Coluna 'HH' contém nulos.")
-    if (df["HH"] < 0).any():
-        errors.append("Coluna 'HH' contém valores negativos.")
-    if (df["acft"] < 0).any():
-        errors.append("Coluna 'acft' contém valores negativos.")
+def warnings(results: list[ValidationResult]) -> list[str]:
+    return [r.message for r in results if not r.ok and r.severity == "warning"]
 
-    if len(df) == 0:
-        errors.append("Dataset está vazio após filtros.")
 
-    return errors
+def run(df: pd.DataFrame, required_columns: list[str] | None = None,
+        rules: list[dict] | None = None) -> list[str]:
+    """
+    Valida o DataFrame do dataset semanal.
+    Retorna lista de mensagens de erro (vazia se tudo ok).
+    """
+    return errors(validate(df, rules, required_columns))
@@ -1,9 +1,16 @@
 """
 Script principal da pipeline de dados.
 Lê config.yaml, executa ingestão → processamento HH → utilização → join → validação → salva dataset.
-Uso: python run_data_pipeline.py [--config caminho/config.yaml]
+As etapas rodam como um grafo (pipeline.dag): etapas sem mudança desde a última execução são
+puladas e as cadeias Unscheduled e Utilização rodam em paralelo.
+--validate-only valida o dataset já gravado (em blocos com data_pipeline.validation_chunksize)
+sem rodar as etapas.
+Com --profile grava data/processed/profile/pipeline_profile.json com tempo, CPU, memória e
+linhas/bytes por etapa (--cprofile / --tracemalloc acrescentam dumps por etapa).
+Uso: python run_data_pipeline.py [--config caminho/config.yaml] [--force] [--profile]
 """
 import argparse
+import json
 import sys
 from pathlib import Path
 
@@ -12,11 +19,31 @@ import yaml
 # Permite rodar a partir da pasta TCC
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+from pipeline import artifacts, durations, schema
+from pipeline import build_dataset as build_module
+from pipeline import cache as cache_module
+from pipeline import ingest_unscheduled as ingest_module
+from pipeline import process_unscheduled_hh as hh_module
+from pipeline import process_utilization as utilization_module
+from pipeline import validate_dataset as validate_module
+from pipeline.cache import purge as purge_cache
+from pipeline.dag import Stage, print_summary, run_stages
+from pipeline.profiling import PipelineProfiler, print_profile
+from pipeline.resources import RssSampler, format_stage_mem
 from pipeline.ingest_unscheduled import run as ingest_unscheduled
 from pipeline.process_unscheduled_hh import run as process_unscheduled_hh
 from pipeline.process_utilization import run as process_utilization
 from pipeline.build_dataset import run as build_dataset
-from pipeline.validate_dataset import run as validate_dataset
+from pipeline.build_dataset import run_incremental as build_dataset_incremental
+from pipeline.build_dataset import load_watermark, save_watermark
+from pipeline.validate_dataset import validate as validate_dataset
+from pipeline.validate_dataset import validate_file
+
+
+class PipelineValidationError(Exception):
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
 
 
 def load_config(config_path: str) -> dict:
@@ -34,6 +61,31 @@ def resolve_path(root: Path, value: str) -> Path:
     return p.resolve()
 
 
+def report_validation(results: list, path: Path | None = None) -> list[str]:
+    """Imprime os avisos, grava os resultados (JSON) e devolve as mensagens de erro."""
+    for msg in validate_module.warnings(results):
+        print(f"  AVISO: {msg}")
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([r.to_dict() for r in results], f, indent=2, ensure_ascii=False)
+    return validate_module.errors(results)
+
+
+def track_memory(run):
+    """Envolve Stage.run: imprime [mem] com o pico de RSS amostrado durante a etapa."""
+
+    def tracked(ctx: dict) -> dict:
+        sampler = RssSampler()
+        sampler.start()
+        try:
+            return run(ctx)
+        finally:
+            sampler.stop()
+            print(f"  [mem] {format_stage_mem(sampler)}")
+
+    return tracked
+
+
 def main():
     parser = argparse.ArgumentParser(description="Pipeline de dados - TCC Previsão HH")
     parser.add_argument(
@@ -46,6 +98,56 @@ def main():
         action="store_true",
         help="Pular utilização (usar só se já tiver bd_utilização e bd_tah em data/processed)",
     )
+    parser.add_argument(
+        "--purge-cache",
+        action="store_true",
+        help="Apagar o cache de leitura dos Excel/CSV brutos antes de rodar",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Não usar o cache de leitura nesta execução",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Recalcular só as semanas recentes do dataset semanal (usa o watermark da execução anterior)",
+    )
+    parser.add_argument(
+        "--legacy-dtypes",
+        action="store_true",
+        help="Ler com os dtypes padrão do pandas (para comparar memória com a política de dtypes)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reexecutar todas as etapas, mesmo as que não mudaram desde a última execução",
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Não rodar as cadeias Unscheduled e Utilização em paralelo",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Medir tempo, CPU, memória e linhas/bytes por etapa (roda as etapas em sequência)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="Pasta do relatório de perfil (padrão: <data_processed>/profile)",
+    )
+    parser.add_argument("--cprofile", action="store_true", help="Com --profile: grava um .prof (cProfile) por etapa")
+    parser.add_argument(
+        "--tracemalloc", action="store_true",
+        help="Com --profile: snapshot do tracemalloc por etapa (bem mais lento)",
+    )
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Só validar o dataset semanal já gravado (em blocos se validation_chunksize > 0)",
+    )
     args = parser.parse_args()
 
     base = Path(__file__).resolve().parent
@@ -54,81 +156,295 @@ def main():
     proj = resolve_path(base, paths.get("project_root", "."))
     encoding = config.get("data_pipeline", {}).get("encoding", "ISO-8859-1")
     required_cols = config.get("data_pipeline", {}).get("required_columns")
+    # Regras declarativas da validação (ausente = validate_dataset.DEFAULT_RULES)
+    validation_rules = config.get("data_pipeline", {}).get("validation_rules")
+    validation_chunksize = int(config.get("data_pipeline", {}).get("validation_chunksize", 0) or 0) or None
     min_date = config.get("data_pipeline", {}).get("min_date", "2014-12-31")
     ac_type = config.get("data_pipeline", {}).get("ac_type_filter", "B737NG")
+    # Média que substitui HH == 0: all = todas as linhas (original) | filtered = só as do ac_type_filter;
+    # com filtered o filtro de tipo/ATA já é aplicado na ingestão (menos linhas em todas as etapas)
+    hh_impute_scope = config.get("data_pipeline", {}).get("hh_impute_scope", "all")
+    ingest_filter = ac_type if hh_impute_scope == "filtered" else None
+    ingest_workers = int(config.get("data_pipeline", {}).get("ingest_workers", 1) or 1)
+    # Utilização em blocos de N linhas (memória limitada); 0/ausente = lê tudo de uma vez
+    util_chunksize = int(config.get("data_pipeline", {}).get("utilization_chunksize", 0) or 0) or None
+    lean_dtypes = config.get("data_pipeline", {}).get("lean_dtypes", True) and not args.legacy_dtypes
+    # Formato dos intermediários e do dataset (parquet/feather tipados; csv = legado)
+    fmt = config.get("data_pipeline", {}).get("artifact_format", "csv")
+    export_csv = config.get("data_pipeline", {}).get("export_csv", False)
 
     dir_all = resolve_path(proj, paths["unscheduled_all"])
     dir_2021 = resolve_path(proj, paths["unscheduled_2021"])
     data_processed = resolve_path(proj, paths["data_processed"])
     data_processed.mkdir(parents=True, exist_ok=True)
     out_semanal = resolve_path(proj, paths["dataset_semanal"])
+    validation_path = out_semanal.with_suffix(".validation.json")
+
+    if args.validate_only:
+        dataset_path = artifacts.find(out_semanal, fmt)
+        if dataset_path is None:
+            print(f"Erro: dataset semanal não encontrado ({artifacts.artifact_path(out_semanal, fmt)}).")
+            sys.exit(1)
+        modo = f"blocos de {validation_chunksize:,} linhas" if validation_chunksize else "arquivo inteiro"
+        print(f"Validando {dataset_path} ({modo})...")
+        results = validate_file(dataset_path, validation_rules, required_cols, chunksize=validation_chunksize)
+        errs = report_validation(results, validation_path)
+        for msg in errs:
+            print(f"  ERRO: {msg}")
+        print(f"  -> {'OK' if not errs else f'{len(errs)} regra(s) com erro'} (resultados: {validation_path})")
+        return 1 if errs else 0
+
+    # Cache por arquivo dos Excel/CSV brutos (só relê o que mudou)
+    cache_root = resolve_path(proj, paths.get("cache_dir", "data/cache"))
+    if args.purge_cache:
+        purge_cache(cache_root)
+        print(f"Cache de leitura apagado: {cache_root}")
+    use_cache = config.get("data_pipeline", {}).get("read_cache", True) and not args.no_cache
+    cache_dir = str(cache_root) if use_cache else None
 
     # Opção: usar CSV já consolidado (quando os Excel estão fora do projeto, ex. OneDrive)
     unscheduled_csv = paths.get("unscheduled_csv")
     csv_path = resolve_path(proj, unscheduled_csv) if unscheduled_csv else None
+    uns_source = artifacts.find(csv_path, fmt) if csv_path else None
 
-    if csv_path and csv_path.exists():
-        print("Etapa 1: Carregando Unscheduled do CSV (unscheduled_csv no config)...")
-        import pandas as pd
-        df_uns = pd.read_csv(csv_path, encoding=encoding)
-        df_uns.to_csv(data_processed / "bd_unscheduled_itens.csv", index=False)
-        print(f"  -> {len(df_uns)} registros")
-    else:
-        print("Etapa 1: Ingestão Unscheduled Items (Excel)...")
-        df_uns = ingest_unscheduled(
-            dir_all=str(dir_all),
-            dir_2021=str(dir_2021),
-            encoding=encoding,
-        )
-        df_uns.to_csv(data_processed / "bd_unscheduled_itens.csv", index=False)
+    # Modo incremental: precisa do dataset anterior + watermark gerado com o mesmo min_date
+    incremental = args.incremental or config.get("data_pipeline", {}).get("incremental", False)
+    lookback_days = int(config.get("data_pipeline", {}).get("incremental_lookback_days", 14))
+    watermark_path = out_semanal.with_suffix(".watermark.json")
+
+    # Com filtered a ingestão tem só o tipo filtrado: artefato próprio, para o bd_unscheduled_itens
+    # (que também é o unscheduled_csv padrão) nunca ficar com um subconjunto
+    uns_all = data_processed / "bd_unscheduled_itens.csv"
+    uns_filtered = data_processed / f"bd_unscheduled_itens_{ac_type}.csv"
+    uns_out = uns_filtered if ingest_filter else uns_all
+    if uns_source and not ingest_filter and uns_source.stem == uns_filtered.stem:
+        print(f"Erro: unscheduled_csv aponta para {uns_source.name}, gerado com hh_impute_scope: filtered "
+              "(só o tipo filtrado); com hh_impute_scope: all use o bd_unscheduled_itens completo.")
+        sys.exit(1)
+    hh_out = data_processed / "bd_hh_agrupado.csv"
+    util_out = data_processed / "bd_utilização_agrupado.csv"
+    tah_out = data_processed / "bd_utl_tah.csv"
+    util_schema = schema.UTILIZATION_AGG if lean_dtypes else None
+
+    # --- Etapas (cada uma devolve um dict com os DataFrames que produz) ---
+
+    def stage_unscheduled(ctx: dict) -> dict:
+        if uns_source:
+            print(f"  Carregando {uns_source.name} (unscheduled_csv no config)")
+            df_uns = artifacts.read(
+                uns_source, schema=schema.UNSCHEDULED if lean_dtypes else None, encoding=encoding
+            )
+            if ingest_filter:
+                # Mesmo filtro que a ingestão aplicaria aos Excel (o CSV pode ter todos os tipos)
+                df_uns = df_uns.loc[hh_module.target_mask(df_uns, ingest_filter)]
+        else:
+            df_uns = ingest_unscheduled(
+                dir_all=str(dir_all),
+                dir_2021=str(dir_2021),
+                encoding=encoding,
+                workers=ingest_workers,
+                cache_dir=cache_dir,
+                lean_dtypes=lean_dtypes,
+                ac_type_filter=ingest_filter,
+            )
+        # Não regrava quando a fonte já é o próprio artefato (mantém o fingerprint estável)
+        if uns_source != artifacts.artifact_path(uns_out, fmt):
+            artifacts.write(df_uns, uns_out, fmt, export_csv)
         print(f"  -> {len(df_uns)} registros")
+        return {"df_uns": df_uns}
 
-    print("Etapa 2: Processamento HH (limpeza e agregação)...")
-    df_hh = process_unscheduled_hh(df_uns, ac_type_filter=ac_type)
-    df_hh.to_csv(data_processed / "bd_hh_agrupado.csv", index=False)
-    print(f"  -> {len(df_hh)} linhas (CLOSING_DATE, AC, HH)")
+    def load_unscheduled() -> dict:
+        path = artifacts.artifact_path(uns_out, fmt)
+        df_uns = artifacts.read(path, schema=schema.UNSCHEDULED if lean_dtypes else None, encoding=encoding)
+        return {"df_uns": df_uns}
 
-    if args.skip_utilization:
-        # Carregar bd_utilização e bd_tah se existirem
-        util_path = data_processed / "bd_utilização_agrupado.csv"
-        tah_path = data_processed / "bd_utl_tah.csv"
-        if not util_path.exists() or not tah_path.exists():
-            print("Erro: --skip-utilization exige bd_utilização_agrupado.csv e bd_utl_tah.csv em data/processed.")
-            sys.exit(1)
+    def stage_hh(ctx: dict) -> dict:
+        df_hh = process_unscheduled_hh(ctx["df_uns"], ac_type_filter=ac_type, impute_scope=hh_impute_scope)
+        artifacts.write(df_hh, hh_out, fmt, export_csv)
+        print(f"  -> {len(df_hh)} linhas (CLOSING_DATE, AC, HH)")
+        return {"df_hh": df_hh}
+
+    def load_hh() -> dict:
+        hh_schema = schema.HH_AGG if lean_dtypes else {"dates": schema.HH_AGG["dates"]}
+        return {"df_hh": artifacts.read(artifacts.artifact_path(hh_out, fmt), schema=hh_schema)}
+
+    def stage_utilization(ctx: dict) -> dict:
+        util_dir = resolve_path(proj, paths["utilization_dir"])
+        df_utilizacao, df_utl_tah = process_utilization(
+            str(util_dir), cache_dir=cache_dir, lean_dtypes=lean_dtypes, chunksize=util_chunksize
+        )
+        artifacts.write(df_utilizacao, util_out, fmt, export_csv)
+        artifacts.write(df_utl_tah, tah_out, fmt, export_csv)
+        print(f"  -> utilização: {len(df_utilizacao)} linhas")
+        return {"df_utilizacao": df_utilizacao, "df_utl_tah": df_utl_tah}
+
+    def load_utilization() -> dict:
         import pandas as pd
-        df_utilizacao = pd.read_csv(util_path)
+        # --skip-utilization também aceita os CSV legados
+        df_utilizacao = artifacts.read(artifacts.find(util_out, fmt), schema=util_schema)
         if "Unnamed: 0" in df_utilizacao.columns:
             df_utilizacao = df_utilizacao.drop(columns=["Unnamed: 0"])
         df_utilizacao["Dep._Date"] = pd.to_datetime(df_utilizacao["Dep._Date"])
-        df_utl_tah = pd.read_csv(tah_path)
+        df_utl_tah = artifacts.read(artifacts.find(tah_out, fmt), schema=util_schema)
         df_utl_tah["Dep._Date"] = pd.to_datetime(df_utl_tah["Dep._Date"])
-    else:
-        print("Etapa 3: Processamento Utilização...")
-        util_dir = resolve_path(proj, paths["utilization_dir"])
-        df_utilizacao, df_utl_tah = process_utilization(str(util_dir))
-        df_utilizacao.to_csv(data_processed / "bd_utilização_agrupado.csv", index=False)
-        df_utl_tah.to_csv(data_processed / "bd_utl_tah.csv", index=False)
-        print(f"  -> utilização: {len(df_utilizacao)} linhas")
+        return {"df_utilizacao": df_utilizacao, "df_utl_tah": df_utl_tah}
 
-    print("Etapa 4: Build dataset semanal (join + agregação)...")
-    df_final = build_dataset(
-        df_hh=df_hh,
-        df_utilizacao=df_utilizacao,
-        df_utl_tah=df_utl_tah,
-        min_date=min_date,
-    )
-    print(f"  -> {len(df_final)} semanas")
+    def stage_build(ctx: dict) -> dict:
+        watermark = load_watermark(watermark_path) if incremental else None
+        previous_path = artifacts.find(out_semanal, fmt) if incremental else None
+        if incremental and (
+            watermark is None
+            or previous_path is None
+            or watermark.get("min_date") != str(min_date)
+        ):
+            print("  Aviso: sem dataset/watermark anterior compatível; build completo.")
+            watermark = None
 
-    print("Etapa 5: Validação...")
-    errs = validate_dataset(df_final, required_columns=required_cols)
-    if errs:
-        for e in errs:
-            print(f"  ERRO: {e}")
-        sys.exit(1)
-    print("  -> OK")
+        if watermark is not None:
+            print(f"  Incremental desde {watermark['last_complete_week'][:10]} "
+                  f"(look-back {lookback_days} dias)")
+            previous = artifacts.read(previous_path, schema=schema.DATASET)
+            df_final, watermark = build_dataset_incremental(
+                df_hh=ctx["df_hh"],
+                df_utilizacao=ctx["df_utilizacao"],
+                df_utl_tah=ctx["df_utl_tah"],
+                previous=previous,
+                watermark=watermark,
+                min_date=min_date,
+                lookback_days=lookback_days,
+            )
+        else:
+            df_final, watermark = build_dataset(
+                df_hh=ctx["df_hh"],
+                df_utilizacao=ctx["df_utilizacao"],
+                df_utl_tah=ctx["df_utl_tah"],
+                min_date=min_date,
+                return_watermark=True,
+            )
+        print(f"  -> {len(df_final)} semanas")
+        return {"df_final": df_final, "watermark": watermark}
+
+    def load_build() -> dict:
+        df_final = artifacts.read(artifacts.artifact_path(out_semanal, fmt), schema=schema.DATASET)
+        return {"df_final": df_final, "watermark": load_watermark(watermark_path)}
 
-    df_final.to_csv(out_semanal, index=False)
-    print(f"Dataset salvo: {out_semanal}")
+    def stage_validate(ctx: dict) -> dict:
+        results = validate_dataset(ctx["df_final"], rules=validation_rules, required_columns=required_cols)
+        errs = report_validation(results, validation_path)
+        if errs:
+            raise PipelineValidationError(errs)
+        print("  -> OK")
+        saved = artifacts.write(ctx["df_final"], out_semanal, fmt, export_csv)
+        save_watermark(watermark_path, ctx["watermark"])
+        print(f"  Dataset salvo: {saved}")
+        return {}
+
+    cfg_leitura = {"encoding": encoding, "lean_dtypes": lean_dtypes, "format": fmt}
+    stages = [
+        Stage(
+            name="unscheduled",
+            description="Etapa 1: Ingestão Unscheduled Items",
+            run=stage_unscheduled,
+            load=load_unscheduled,
+            inputs=[uns_source] if uns_source else [dir_all, dir_2021],
+            outputs=[artifacts.artifact_path(uns_out, fmt)],
+            config={**cfg_leitura, "ac_type_filter": ingest_filter},
+            # hh_module: target_mask/EXCLUDED_ATA filtram a ingestão no modo "filtered"
+            code=[ingest_module, hh_module, schema, cache_module],
+        ),
+        Stage(
+            name="hh",
+            description="Etapa 2: Processamento HH (limpeza e agregação)",
+            run=stage_hh,
+            load=load_hh,
+            deps=["unscheduled"],
+            outputs=[artifacts.artifact_path(hh_out, fmt)],
+            config={"ac_type_filter": ac_type, "impute_scope": hh_impute_scope, "format": fmt},
+            code=[hh_module, durations],
+        ),
+        Stage(
+            name="utilization",
+            description="Etapa 3: Processamento Utilização",
+            run=stage_utilization,
+            load=load_utilization,
+            inputs=[resolve_path(proj, paths["utilization_dir"])],
+            outputs=[artifacts.artifact_path(util_out, fmt), artifacts.artifact_path(tah_out, fmt)],
+            config={**cfg_leitura, "chunksize": util_chunksize},
+            code=[utilization_module, durations, schema, cache_module],
+        ),
+        Stage(
+            name="build",
+            description="Etapa 4: Build dataset semanal (join + agregação)",
+            run=stage_build,
+            load=load_build,
+            deps=["hh", "utilization"],
+            outputs=[artifacts.artifact_path(out_semanal, fmt), watermark_path],
+            config={"min_date": str(min_date), "incremental": bool(incremental),
+                    "lookback_days": lookback_days, "format": fmt},
+            code=[build_module],
+        ),
+        Stage(
+            name="validate",
+            description="Etapa 5: Validação",
+            run=stage_validate,
+            load=lambda: {},
+            deps=["build"],
+            outputs=[artifacts.artifact_path(out_semanal, fmt), watermark_path, validation_path],
+            config={"required_columns": required_cols, "rules": validation_rules, "export_csv": export_csv},
+            code=[validate_module],
+        ),
+    ]
+
+    # Sem --skip-utilization, a etapa 3 só é pulada se nada mudou desde a última execução
+    reuse = {"utilization"} if args.skip_utilization else set()
+    if args.skip_utilization:
+        encontrados = [artifacts.find(util_out, fmt), artifacts.find(tah_out, fmt)]
+        if None in encontrados:
+            print("Erro: --skip-utilization exige bd_utilização_agrupado e bd_utl_tah (csv ou "
+                  f"{fmt}) em data/processed.")
+            sys.exit(1)
+        # A etapa é recarregada do que existe em disco (pode ser o CSV legado)
+        next(st for st in stages if st.name == "utilization").outputs = encontrados
+    parallel = config.get("data_pipeline", {}).get("parallel_stages", True) and not args.sequential
+
+    for st in stages:
+        st.run = track_memory(st.run)
+
+    profiler = None
+    if args.profile:
+        # Medições de CPU/memória são do processo: etapas em paralelo se misturariam
+        parallel = False
+        profile_dir = resolve_path(proj, args.profile_dir) if args.profile_dir else data_processed / "profile"
+        profiler = PipelineProfiler(profile_dir, cprofile=args.cprofile, trace_memory=args.tracemalloc)
+        for st in stages:
+            st.run = profiler.wrap(st.name, st.run, st.inputs)
+
+    try:
+        if profiler is not None:
+            with profiler:
+                _, reports = run_stages(
+                    stages,
+                    state_path=data_processed / ".pipeline_state.json",
+                    force=args.force,
+                    reuse=reuse,
+                    max_workers=1,
+                )
+        else:
+            _, reports = run_stages(
+                stages,
+                state_path=data_processed / ".pipeline_state.json",
+                force=args.force,
+                reuse=reuse,
+                max_workers=2 if parallel else 1,
+            )
+    except PipelineValidationError as e:
+        for msg in e.errors:
+            print(f"  ERRO: {msg}")
+        sys.exit(1)
+    print_summary(reports)
+    if profiler is not None:
+        print_profile(profiler.report(reports))
+        print(f"Relatório de perfil: {profiler.save(reports)}")
     return 0
 
 
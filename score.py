@@ -0,0 +1,224 @@
+"""
+Scoring offline em lote (sem passar pela API).
+Carrega o modelo de produção como o app (config/registry, engine numpy ou keras), lê a
+entrada (CSV, Parquet ou Feather; ex.: dataset_uti_vs_hh_semanal.csv ou uma grade de
+cenários) em blocos de --chunksize linhas, roda o modelo uma vez por bloco e grava as
+colunas de entrada + a previsão. A memória fica limitada ao tamanho do bloco.
+Linhas com feature ausente ou inválida recebem previsão vazia (NaN).
+Uso: python score.py entrada.csv [--output saida.parquet] [--chunksize 200000]
+     [--version 1.0.0] [--variant 4features]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import app as app_module
+from pipeline.resources import format_mem
+
+FORMATS = (".csv", ".parquet", ".feather")
+
+
+def read_chunks(path: Path, chunksize: int):
+    """Blocos (DataFrame) da entrada, sem carregar o arquivo inteiro."""
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=chunksize, float_precision="round_trip")
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif suffix == ".feather":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                df = reader.get_batch(i).to_pandas()
+                for start in range(0, len(df), chunksize):
+                    yield df.iloc[start:start + chunksize]
+    else:
+        raise ValueError(f"Formato de entrada não suportado: {path.suffix}. Use um de {FORMATS}.")
+
+
+def input_schema(path: Path):
+    """Schema Arrow declarado pela entrada (Parquet/Feather); None para CSV, que não declara tipos."""
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).schema_arrow
+    if suffix == ".feather":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).schema
+    return None
+
+
+def output_schema(path: Path, chunk: pd.DataFrame, features: list[str], column: str):
+    """
+    Schema da saída Parquet/Feather, fixado no primeiro bloco sem depender dos valores dele:
+    a previsão é float64 e as colunas da entrada mantêm o tipo declarado pelo arquivo
+    (Parquet/Feather). CSV não declara tipos: features do modelo e inteiros viram float64
+    (um bloco com vazio vira float) e as demais colunas seguem o primeiro bloco, com as só
+    nulas como texto.
+    """
+    import pyarrow as pa
+
+    declarado = input_schema(path)
+    campos = []
+    for name in chunk.columns:
+        if name == column:
+            tipo = pa.float64()
+        elif declarado is not None and name in declarado.names:
+            tipo = declarado.field(name).type
+        else:
+            if name in features:
+                tipo = pa.float64()
+            elif chunk[name].isna().all():
+                # Só vazios no primeiro bloco (o pandas lê como float): o tipo real é desconhecido
+                tipo = pa.string()
+            else:
+                tipo = pa.Schema.from_pandas(chunk[[name]], preserve_index=False).field(name).type
+                if pa.types.is_integer(tipo):
+                    tipo = pa.float64()
+        campos.append(pa.field(name, tipo))
+    return pa.schema(campos)
+
+
+class ChunkWriter:
+    """
+    Grava blocos em sequência: CSV (append), Parquet (row groups) ou Feather (record batches).
+    schema (Arrow, ver output_schema) fixa os tipos da saída; sem ele, vale o do primeiro bloco.
+    Pode ser atribuído até o primeiro write.
+    """
+
+    def __init__(self, path: Path, schema=None):
+        self.path = path
+        self.suffix = path.suffix.lower()
+        if self.suffix not in FORMATS:
+            raise ValueError(f"Formato de saída não suportado: {path.suffix}. Use um de {FORMATS}.")
+        self._writer = None
+        self.schema = schema
+        self._header = False
+
+    def _conform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Colunas declaradas como texto recebem str (nulos continuam nulos)."""
+        import pyarrow as pa
+
+        out = df
+        for field in self.schema:
+            if pa.types.is_string(field.type) and field.name in df.columns and out[field.name].dtype != object:
+                s = out[field.name].astype(object)
+                out = out.assign(**{field.name: s.where(s.isna(), s.astype(str))})
+        return out
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.suffix == ".csv":
+            df.to_csv(self.path, mode="a" if self._header else "w", header=not self._header, index=False)
+            self._header = True
+            return
+        import pyarrow as pa
+
+        if self.schema is not None:
+            df = self._conform(df)
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self._writer is None:
+            self.schema = table.schema
+            if self.suffix == ".parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self._writer = pa.ipc.new_file(str(self.path), self.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def predict_chunk(predictor, features: list[str], df: pd.DataFrame) -> np.ndarray:
+    """Previsão por linha (NaN onde alguma feature falta ou não é numérica)."""
+    X = df.reindex(columns=features).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    ok = np.isfinite(X).all(axis=1)
+    pred = np.full(len(df), np.nan)
+    if ok.any():
+        pred[ok] = predictor.predict(X[ok].astype(np.float32))
+    return pred
+
+
+def load_model(version: str | None, variant: str):
+    """Mesmo modelo que o app usaria (versão de produção, salvo --version)."""
+    if version in (None, "", "production", "latest"):
+        models_dir = app_module._resolve_models_dir()
+    else:
+        models_dir = app_module._resolve_version_dir(version)
+    return app_module._load_snapshot(models_dir, variant)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring offline em lote - Previsão HH")
+    parser.add_argument("input", help="Arquivo de entrada (.csv, .parquet ou .feather)")
+    parser.add_argument("--output", default=None, help="Arquivo de saída (padrão: <entrada>_scored.<ext>)")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="Linhas por bloco")
+    parser.add_argument("--version", default=None, help="Versão do modelo (padrão: a de produção)")
+    parser.add_argument("--variant", default=app_module.VARIANT, choices=app_module.VARIANTS)
+    parser.add_argument("--column", default="HH_pred", help="Nome da coluna de previsão")
+    args = parser.parse_args()
+
+    entrada = Path(args.input)
+    if not entrada.exists():
+        print(f"Erro: arquivo não encontrado: {entrada}")
+        return 1
+    saida = Path(args.output) if args.output else entrada.with_name(f"{entrada.stem}_scored{entrada.suffix}")
+    if saida.resolve() == entrada.resolve():
+        print("Erro: a saída não pode sobrescrever a entrada.")
+        return 1
+
+    try:
+        snap = load_model(args.version, args.variant)
+    except (FileNotFoundError, LookupError) as e:
+        print(f"Erro: {e}")
+        return 1
+    print(f"Modelo: {snap.version} ({snap.variant}, engine {snap.engine}, carregado em {snap.load_seconds:.2f}s)")
+
+    writer = ChunkWriter(saida)
+    linhas, validas, t_modelo = 0, 0, 0.0
+    t0 = time.perf_counter()
+    try:
+        for i, chunk in enumerate(read_chunks(entrada, args.chunksize)):
+            if i == 0:
+                faltando = [f for f in snap.features if f not in chunk.columns]
+                if faltando:
+                    print(f"Erro: colunas de features ausentes na entrada: {faltando}")
+                    return 1
+            t = time.perf_counter()
+            pred = predict_chunk(snap.predictor, snap.features, chunk)
+            t_modelo += time.perf_counter() - t
+            chunk = chunk.assign(**{args.column: pred})
+            if i == 0 and writer.suffix != ".csv":
+                writer.schema = output_schema(entrada, chunk, snap.features, args.column)
+            writer.write(chunk)
+            linhas += len(chunk)
+            validas += int(np.isfinite(pred).sum())
+            decorrido = time.perf_counter() - t0
+            print(f"  {linhas:>12,} linhas | {linhas / decorrido:>12,.0f} linhas/s | {format_mem()}")
+    finally:
+        writer.close()
+
+    total = time.perf_counter() - t0
+    print(f"Concluído: {linhas:,} linhas ({linhas - validas:,} sem previsão) em {total:.2f}s "
+          f"= {linhas / total if total else 0:,.0f} linhas/s "
+          f"(modelo + validação: {linhas / t_modelo if t_modelo else 0:,.0f} linhas/s).")
+    print(f"Saída: {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Servidor de produção do app (em vez do servidor de desenvolvimento do Flask).
+- Linux/macOS: gunicorn. Com o engine NumPy o modelo é carregado e aquecido no processo
+  principal antes do fork, e os workers compartilham os pesos (copy-on-write). Com o engine
+  Keras cada worker carrega o seu (TensorFlow não é seguro após fork).
+- Windows: waitress (um processo, várias threads).
+/api/ready só responde 200 depois do warm-up.
+Config: seção serving.server do config.yaml (host, port, workers, threads).
+Uso: python serve.py [--workers 4] [--threads 4] [--port 5000]
+"""
+import argparse
+import sys
+
+import app as app_module
+
+
+def _server_config() -> dict:
+    cfg = app_module._load_config().get("serving", {}).get("server", {})
+    return {
+        "host": cfg.get("host", "0.0.0.0"),
+        "port": int(cfg.get("port", 5000)),
+        "workers": int(cfg.get("workers", 2)),
+        "threads": int(cfg.get("threads", 4)),
+    }
+
+
+def run_gunicorn(host: str, port: int, workers: int, threads: int) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    preload = app_module.resolved_engine() != "keras"
+
+    class _App(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread" if threads > 1 else "sync")
+            self.cfg.set("preload_app", preload)
+            if not preload:
+                self.cfg.set("post_worker_init", lambda worker: app_module.warm_up())
+
+        def load(self):
+            return app_module.app
+
+    if preload:
+        app_module.warm_up()
+    print(f"gunicorn em http://{host}:{port} ({workers} workers x {threads} threads, "
+          f"engine {app_module.resolved_engine()}, preload {'sim' if preload else 'não'})")
+    _App().run()
+
+
+def run_waitress(host: str, port: int, threads: int) -> None:
+    from waitress import serve
+
+    app_module.warm_up()
+    print(f"waitress em http://{host}:{port} ({threads} threads, engine {app_module._active.engine})")
+    serve(app_module.app, host=host, port=port, threads=threads)
+
+
+def main():
+    cfg = _server_config()
+    parser = argparse.ArgumentParser(description="Servidor de produção - Previsão HH")
+    parser.add_argument("--host", default=cfg["host"])
+    parser.add_argument("--port", type=int, default=cfg["port"])
+    parser.add_argument("--workers", type=int, default=cfg["workers"], help="Processos (só gunicorn)")
+    parser.add_argument("--threads", type=int, default=cfg["threads"], help="Threads por processo")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        run_waitress(args.host, args.port, args.threads)
+        return 0
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("gunicorn não instalado; usando waitress (um processo). pip install -r requirements.txt")
+        run_waitress(args.host, args.port, args.threads)
+        return 0
+    run_gunicorn(args.host, args.port, args.workers, args.threads)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
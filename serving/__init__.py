@@ -0,0 +1 @@
+# Inferência e serving do modelo - TCC Previsão HH
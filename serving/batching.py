@@ -0,0 +1,116 @@
+"""
+Micro-batching de previsões unitárias.
+Requisições concorrentes entram numa fila com o modelo (predict_fn) que resolveram; uma
+thread junta até max_batch vetores ou espera no máximo max_wait_ms a partir do primeiro,
+roda uma passada por modelo e devolve cada resultado à requisição que o pediu. Um pedido
+feito antes de uma troca de modelo sai sempre do modelo que ele pegou.
+Se o lote não sai em timeout_ms (thread parada ou morta), a requisição roda o modelo direto.
+Com on_phases, predict_fn segue o contrato de predict_timed ((n, n_features) -> (HH, fases))
+e on_phases(fases) recebe os tempos de cada passada (lote ou fallback).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+from serving.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_MS_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+
+class MicroBatcher:
+    def __init__(
+        self, max_batch: int = 32, max_wait_ms: float = 2.0, timeout_ms: float = 1000.0, on_phases=None
+    ):
+        self.on_phases = on_phases
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.timeout = max(self.max_wait, float(timeout_ms) / 1000)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.timeouts = 0
+        self._pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        # Por processo: a thread não sobrevive a um fork (ex.: workers do gunicorn com preload)
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            # Thread morta no mesmo processo: outra assume a fila (itens antigos caem no timeout)
+            self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, x: np.ndarray, predict_fn) -> float:
+        """
+        Enfileira um vetor (n_features,) para predict_fn ((n, n_features) float32 -> (n,) HH,
+        ex.: FusedMLP.predict; FusedMLP.predict_timed se o batcher tem on_phases) e bloqueia
+        até o HH do lote sair. Depois de timeout segundos sem resposta, roda o modelo só para
+        este vetor.
+        """
+        self._ensure_started()
+        fut = Future()
+        self._queue.put((x, time.perf_counter(), fut, predict_fn))
+        try:
+            return fut.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            return float(self._run(predict_fn, x[None, :])[0])
+
+    def _run(self, predict_fn, X: np.ndarray) -> np.ndarray:
+        if self.on_phases is None:
+            return predict_fn(X)
+        y, phases = predict_fn(X)
+        self.on_phases(phases)
+        return y
+
+    def _loop(self) -> None:
+        while True:
+            itens = [self._queue.get()]
+            prazo = itens[0][1] + self.max_wait
+            while len(itens) < self.max_batch:
+                resta = prazo - time.perf_counter()
+                try:
+                    itens.append(self._queue.get(timeout=resta) if resta > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            inicio = time.perf_counter()
+            # Um lote por modelo: perto de uma troca, a fila tem pedidos do antigo e do novo
+            grupos = {}
+            for item in itens:
+                grupos.setdefault(item[3], []).append(item)
+            for predict_fn, grupo in grupos.items():
+                self.batch_size.observe(len(grupo))
+                for _, t_fila, _, _ in grupo:
+                    self.queue_wait_ms.observe((inicio - t_fila) * 1000)
+                try:
+                    y = self._run(predict_fn, np.stack([x for x, _, _, _ in grupo]).astype(np.float32, copy=False))
+                except Exception as e:
+                    for _, _, fut, _ in grupo:
+                        fut.set_exception(e)
+                    continue
+                for (_, _, fut, _), v in zip(grupo, y):
+                    fut.set_result(float(v))
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "timeout_ms": self.timeout * 1000,
+            "timeouts": self.timeouts,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
@@ -0,0 +1,67 @@
+"""
+Cache LRU de previsões unitárias (/api/predict).
+Chave: identificação do modelo (snapshot) + vetor de features normalizado, opcionalmente
+arredondado a `precision` casas decimais (entradas quase iguais reaproveitam o resultado).
+Trocar o modelo muda a chave, e o app limpa o cache no hot-reload.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 10_000, precision: int | None = None):
+        self.max_entries = int(max_entries)
+        self.precision = precision
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, model_key, x: np.ndarray) -> tuple:
+        """Chave de (modelo, features); -0.0 e 0.0 caem na mesma entrada."""
+        x = np.asarray(x, dtype=np.float64)
+        if self.precision is not None:
+            x = np.round(x, self.precision)
+        return (model_key, tuple((x + 0.0).tolist()))
+
+    def get(self, key):
+        """Valor em cache ou None (conta hit/miss)."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value: float) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "precision": self.precision,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,232 @@
+"""
+Inferência do MLP sem TensorFlow.
+O treino exporta, ao lado do .keras, um .npz com os pesos das camadas Dense e os
+parâmetros dos MinMaxScaler (X e y); NumpyMLP refaz o forward pass só com NumPy.
+FusedMLP é a versão de serving: scalers dobrados nos pesos, float32 e sem alocação
+por requisição em predict_one.
+Uso (exportar modelos já treinados, requer TensorFlow):
+    python -m serving.inference [--models-dir models/1.0.0]
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+ACTIVATIONS = {
+    "relu": lambda z: np.maximum(z, 0.0),
+    "linear": lambda z: z,
+}
+
+
+def npz_path(models_dir, variant: str) -> Path:
+    return Path(models_dir) / f"model_hh_semanal_{variant}.npz"
+
+
+def export_numpy(model, scaler_X, scaler_y, path, features: list[str]) -> Path:
+    """
+    Grava pesos (W_i, b_i), ativações e min_/scale_ dos scalers em um .npz compacto.
+    model: modelo Keras Sequential só com camadas Dense (como em train.build_model).
+    """
+    arrays = {}
+    activations = []
+    dense = [l for l in model.layers if l.get_weights()]
+    for i, layer in enumerate(dense):
+        W, b = layer.get_weights()
+        act = layer.get_config().get("activation", "linear")
+        if act not in ACTIVATIONS:
+            raise ValueError(f"Ativação não suportada na exportação: {act} (camada {layer.name})")
+        arrays[f"W{i}"] = W
+        arrays[f"b{i}"] = b
+        activations.append(act)
+    path = Path(path)
+    np.savez(
+        path,
+        **arrays,
+        activations=np.array(activations),
+        features=np.array(features),
+        x_min=scaler_X.min_,
+        x_scale=scaler_X.scale_,
+        y_min=scaler_y.min_,
+        y_scale=scaler_y.scale_,
+    )
+    return path
+
+
+class NumpyMLP:
+    """MLP exportado por export_numpy: predict(X) recebe features na escala original e devolve HH."""
+
+    def __init__(self, weights, biases, activations, features, x_min, x_scale, y_min, y_scale):
+        self.weights = [np.asarray(W, dtype=np.float64) for W in weights]
+        self.biases = [np.asarray(b, dtype=np.float64) for b in biases]
+        self.activations = [ACTIVATIONS[a] for a in activations]
+        self.features = list(features)
+        self.x_min, self.x_scale = np.asarray(x_min, np.float64), np.asarray(x_scale, np.float64)
+        self.y_min, self.y_scale = np.asarray(y_min, np.float64), np.asarray(y_scale, np.float64)
+
+    @classmethod
+    def load(cls, path) -> "NumpyMLP":
+        with np.load(path) as z:
+            n = len(z["activations"])
+            return cls(
+                weights=[z[f"W{i}"] for i in range(n)],
+                biases=[z[f"b{i}"] for i in range(n)],
+                activations=[str(a) for a in z["activations"]],
+                features=[str(f) for f in z["features"]],
+                x_min=z["x_min"], x_scale=z["x_scale"],
+                y_min=z["y_min"], y_scale=z["y_scale"],
+            )
+
+    def predict(self, X) -> np.ndarray:
+        """X: (n, n_features) na ordem de self.features. Retorna HH com shape (n,)."""
+        h = np.asarray(X, dtype=np.float64) * self.x_scale + self.x_min
+        for W, b, act in zip(self.weights, self.biases, self.activations):
+            h = act(h @ W + b)
+        return ((h - self.y_min) / self.y_scale)[:, 0]
+
+
+class FusedMLP:
+    """
+    MLP com os MinMaxScaler dobrados nos pesos (float32):
+      1ª camada: (X * sx + mx) @ W0 + b0 = X @ (sx[:, None] * W0) + (mx @ W0 + b0)
+      saída:     (h @ Wn + bn - my) / sy = h @ (Wn / sy) + (bn - my) / sy
+    predict(X) recebe as features na escala original e devolve HH, sem DataFrame nem scaler.
+    """
+
+    def __init__(self, mlp: NumpyMLP, dtype=np.float32):
+        weights = [W.copy() for W in mlp.weights]
+        biases = [b.copy() for b in mlp.biases]
+        # Dobra feita em float64; só o resultado é convertido
+        biases[0] = mlp.x_min @ weights[0] + biases[0]
+        weights[0] = mlp.x_scale[:, None] * weights[0]
+        biases[-1] = (biases[-1] - mlp.y_min) / mlp.y_scale
+        weights[-1] = weights[-1] / mlp.y_scale
+        self.dtype = np.dtype(dtype)
+        self.weights = [np.ascontiguousarray(W, dtype=self.dtype) for W in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=self.dtype) for b in biases]
+        self.activations = mlp.activations
+        self.relu = [a is ACTIVATIONS["relu"] for a in mlp.activations]
+        self.features = mlp.features
+        self._local = threading.local()
+
+    @classmethod
+    def load(cls, path, dtype=np.float32) -> "FusedMLP":
+        return cls(NumpyMLP.load(path), dtype=dtype)
+
+    def predict(self, X) -> np.ndarray:
+        """X: (n, n_features) na ordem de self.features. Retorna HH com shape (n,)."""
+        h = np.asarray(X, dtype=self.dtype)
+        for W, b, act in zip(self.weights, self.biases, self.activations):
+            h = act(h @ W + b)
+        return h[:, 0]
+
+    def _buffers(self) -> list[np.ndarray]:
+        # Um conjunto de buffers por thread (o Flask atende requisições em threads)
+        bufs = getattr(self._local, "bufs", None)
+        if bufs is None:
+            bufs = [np.empty(W.shape[1], dtype=self.dtype) for W in self.weights]
+            self._local.bufs = bufs
+        return bufs
+
+    def predict_one(self, x) -> float:
+        """x: vetor (n_features,) float32, de preferência pré-alocado. Retorna HH."""
+        h = x if isinstance(x, np.ndarray) and x.dtype == self.dtype else np.asarray(x, dtype=self.dtype)
+        for W, b, relu, out in zip(self.weights, self.biases, self.relu, self._buffers()):
+            np.dot(h, W, out=out)
+            np.add(out, b, out=out)
+            if relu:
+                np.maximum(out, 0, out=out)
+            h = out
+        return float(h[0])
+
+    def predict_timed(self, X) -> tuple[np.ndarray, dict]:
+        """predict + segundos por fase. Escala e inversa estão dobradas nos pesos: só 'forward'."""
+        t0 = time.perf_counter()
+        y = self.predict(X)
+        return y, {"forward": time.perf_counter() - t0}
+
+    def predict_one_timed(self, x) -> tuple[float, dict]:
+        t0 = time.perf_counter()
+        y = self.predict_one(x)
+        return y, {"forward": time.perf_counter() - t0}
+
+
+class KerasPredictor:
+    """Mesmo contrato de NumpyMLP sobre o .keras + scalers joblib (importa TensorFlow)."""
+
+    def __init__(self, model_path, scaler_x_path, scaler_y_path, features=None):
+        """features: ordem das colunas; se None, a usada no fit do scaler_X."""
+        import joblib
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(model_path)
+        self.scaler_x = joblib.load(scaler_x_path)
+        self.scaler_y = joblib.load(scaler_y_path)
+        if features is None:
+            features = getattr(self.scaler_x, "feature_names_in_", None)
+            if features is None:
+                raise ValueError(f"{scaler_x_path}: scaler sem nomes de features; informe features.")
+        self.features = list(features)
+
+    def predict(self, X) -> np.ndarray:
+        return self.predict_timed(X)[0]
+
+    def predict_timed(self, X) -> tuple[np.ndarray, dict]:
+        """predict + segundos por fase (scale, forward, inverse)."""
+        import pandas as pd
+
+        t0 = time.perf_counter()
+        X = pd.DataFrame(np.asarray(X, dtype=np.float64), columns=self.features)
+        X_scaled = self.scaler_x.transform(X)
+        t1 = time.perf_counter()
+        y_scaled = self.model.predict(X_scaled, batch_size=max(len(X), 1), verbose=0)
+        t2 = time.perf_counter()
+        y = self.scaler_y.inverse_transform(y_scaled)[:, 0]
+        return y, {"scale": t1 - t0, "forward": t2 - t1, "inverse": time.perf_counter() - t2}
+
+    def predict_one(self, x) -> float:
+        return float(self.predict(np.asarray(x, dtype=np.float64)[None, :])[0])
+
+    def predict_one_timed(self, x) -> tuple[float, dict]:
+        y, phases = self.predict_timed(np.asarray(x, dtype=np.float64)[None, :])
+        return float(y[0]), phases
+
+
+def export_dir(models_dir, variants=("4features", "5features")) -> list[Path]:
+    """Gera o .npz de cada variante com .keras em models_dir (modelos treinados antes da exportação)."""
+    import joblib
+    import tensorflow as tf
+
+    models_dir = Path(models_dir)
+    gerados = []
+    for variant in variants:
+        model_path = models_dir / f"model_hh_semanal_{variant}.keras"
+        if not model_path.exists():
+            continue
+        model = tf.keras.models.load_model(model_path)
+        scaler_X = joblib.load(models_dir / f"scaler_X_{variant}.joblib")
+        scaler_y = joblib.load(models_dir / f"scaler_y_{variant}.joblib")
+        features = getattr(scaler_X, "feature_names_in_", None)
+        if features is None:
+            raise ValueError(f"{variant}: scaler_X sem nomes de features; exporte pelo train.py.")
+        gerados.append(export_numpy(model, scaler_X, scaler_y, npz_path(models_dir, variant), list(features)))
+    return gerados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta modelos .keras para o formato NumPy (.npz)")
+    parser.add_argument("--models-dir", default="models", help="Pasta com model_hh_semanal_*.keras e scalers")
+    args = parser.parse_args()
+    gerados = export_dir(args.models_dir)
+    if not gerados:
+        print(f"Nenhum modelo .keras encontrado em {args.models_dir}")
+        return 1
+    for p in gerados:
+        print(f"Exportado: {p}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Métricas em memória para o serving (seguras entre threads): histogramas de buckets fixos,
+contadores com labels e gauges calculados na leitura. Registry.render() gera o formato
+texto do Prometheus (GET /metrics).
+"""
+import threading
+from bisect import bisect_left
+
+
+def _json_limit(v: float | None):
+    # Infinity não é JSON válido
+    return "+Inf" if v == float("inf") else v
+
+
+class Histogram:
+    """Contagem por bucket (limite superior inclusivo) + soma e total, como no Prometheus."""
+
+    def __init__(self, buckets: list[float]):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, n: int = 1) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += n
+            self._sum += value * n
+            self._count += n
+
+    def quantile(self, q: float) -> float | None:
+        """Estimativa pelo limite superior do bucket que contém o quantil q."""
+        with self._lock:
+            counts, total = list(self._counts), self._count
+        if total == 0:
+            return None
+        alvo = q * total
+        acumulado = 0
+        for limite, c in zip(self.buckets + [float("inf")], counts):
+            acumulado += c
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total, soma = list(self._counts), self._count, self._sum
+        acumulado, buckets = 0, {}
+        for limite, c in zip(self.buckets + [float("inf")], counts):
+            acumulado += c
+            buckets["+Inf" if limite == float("inf") else str(limite)] = acumulado
+        return {
+            "count": total,
+            "sum": soma,
+            "mean": soma / total if total else None,
+            "p50": _json_limit(self.quantile(0.5)),
+            "p99": _json_limit(self.quantile(0.99)),
+            "buckets": buckets,
+        }
+
+
+class Counter:
+    """Contador monotônico; cada combinação de labels é uma série."""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def samples(self) -> list[tuple[dict, float]]:
+        with self._lock:
+            return [(dict(k), v) for k, v in self._values.items()]
+
+
+def _labels(labels: dict, extra: dict | None = None) -> str:
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Registry:
+    """Conjunto de métricas com nome, ajuda e tipo; render() no formato texto do Prometheus."""
+
+    def __init__(self):
+        self._families = {}  # nome -> [tipo, ajuda, [(labels, métrica)]]
+        self._lock = threading.Lock()
+
+    def _add(self, name: str, kind: str, help_text: str, labels: dict, metric):
+        with self._lock:
+            family = self._families.setdefault(name, [kind, help_text, []])
+            family[2].append((labels, metric))
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._add(name, "counter", help_text, {}, Counter())
+
+    def histogram(self, name: str, help_text: str, buckets: list[float], **labels) -> Histogram:
+        return self._add(name, "histogram", help_text, labels, Histogram(buckets))
+
+    def gauge(self, name: str, help_text: str, fn, kind: str = "gauge", **labels) -> None:
+        """Valor lido de fn() a cada render (None = série omitida). kind="counter" para totais."""
+        self._add(name, kind, help_text, labels, fn)
+
+    def render(self) -> str:
+        with self._lock:
+            families = [(n, k, h, list(series)) for n, (k, h, series) in self._families.items()]
+        lines = []
+        for name, kind, help_text, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                if isinstance(metric, Histogram):
+                    snap = metric.snapshot()
+                    for limite, acumulado in snap["buckets"].items():
+                        lines.append(f"{name}_bucket{_labels(labels, {'le': limite})} {acumulado}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_num(snap['sum'])}")
+                    lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+                elif isinstance(metric, Counter):
+                    for sample_labels, v in sorted(metric.samples(), key=lambda s: sorted(s[0].items())):
+                        lines.append(f"{name}{_labels(labels, sample_labels)} {_num(v)}")
+                else:
+                    v = metric()
+                    if v is not None:
+                        lines.append(f"{name}{_labels(labels)} {_num(v)}")
+        return "\n".join(lines) + "\n"
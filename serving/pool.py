@@ -0,0 +1,92 @@
+"""
+Pool de modelos em memória (versão, variante) com LRU e orçamento de memória.
+O modelo de produção fica fora do pool (não é despejado); o pool guarda os que são
+pedidos explicitamente (?version=&variant=) ou usados no shadow scoring.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def model_nbytes(predictor) -> int:
+    """
+    Bytes dos pesos: arrays NumPy (FusedMLP) ou nº de parâmetros x 4 (Keras, float32).
+    Não inclui o resto do modelo (grafo e runtime do TensorFlow, buffers do ONNX Runtime,
+    scaler): o orçamento do pool limita só os pesos, e o RSS real por modelo é maior,
+    sobretudo nos engines keras/onnx. Medir o RSS em volta da carga não serve aqui, porque
+    outras threads alocam ao mesmo tempo.
+    """
+    weights = getattr(predictor, "weights", None)
+    if weights and all(isinstance(w, np.ndarray) for w in weights):
+        return sum(w.nbytes for w in weights) + sum(b.nbytes for b in getattr(predictor, "biases", []))
+    model = getattr(predictor, "model", None)
+    if model is not None and hasattr(model, "count_params"):
+        return int(model.count_params()) * 4
+    return 0
+
+
+class ModelPool:
+    """LRU de snapshots; budget_mb soma só os pesos de cada modelo (ver model_nbytes)."""
+
+    def __init__(self, budget_mb: float = 256):
+        self.budget = float(budget_mb) * 1024 * 1024
+        self._entries = OrderedDict()  # key -> (snapshot, nbytes)
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        """Snapshot de key; se ausente, loader() carrega (uma vez, mesmo com requisições simultâneas)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+            try:
+                snap = loader()
+            except Exception:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            with self._lock:
+                self._entries[key] = (snap, model_nbytes(snap.predictor))
+                self.loads += 1
+                self._evict(keep=key)
+                self._loading.pop(key, None)
+        return snap
+
+    def _evict(self, keep) -> None:
+        total = sum(n for _, n in self._entries.values())
+        while total > self.budget and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            _, n = self._entries.pop(key)
+            total -= n
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = [
+                {"version": s.version, "variant": s.variant, "mb": round(n / 1024 / 1024, 3)}
+                for s, n in self._entries.values()
+            ]
+            total = sum(n for _, n in self._entries.values())
+        return {
+            "budget_mb": self.budget / 1024 / 1024,
+            "used_mb": round(total / 1024 / 1024, 3),
+            "models": entries,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
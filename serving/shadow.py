@@ -0,0 +1,87 @@
+"""
+Shadow scoring: uma versão candidata recebe uma cópia do tráfego real em segundo plano.
+submit() só enfileira (descarta se a fila estiver cheia), então a resposta principal
+não espera; a thread compara a previsão da candidata com a de produção.
+"""
+import os
+import queue
+import random
+import threading
+
+import numpy as np
+
+
+class ShadowScorer:
+    def __init__(self, get_candidate, sample_rate: float = 1.0, max_queue: int = 1000):
+        """get_candidate: () -> snapshot da candidata (com .predictor, .features, .version, .variant)."""
+        self.get_candidate = get_candidate
+        self.sample_rate = float(sample_rate)
+        self.max_queue = max_queue
+        self.scored = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.candidate = None
+        self._sum_abs = 0.0
+        self._sum_rel = 0.0
+        self._max_abs = 0.0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            threading.Thread(target=self._loop, name="shadow-scorer", daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, X: np.ndarray, y_primary: np.ndarray, features: list[str]) -> None:
+        """X: (n, len(features)) na escala original; y_primary: HH de produção para as mesmas linhas."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((X, y_primary, features))
+        except queue.Full:
+            # Várias threads de requisição descartam ao mesmo tempo: += sem lock perde contagens
+            with self._lock:
+                self.dropped += 1
+
+    def _loop(self) -> None:
+        while True:
+            X, y_primary, features = self._queue.get()
+            try:
+                cand = self.get_candidate()
+                self.candidate = {"version": cand.version, "variant": cand.variant}
+                idx = [features.index(f) for f in cand.features]
+                y = np.asarray(cand.predictor.predict(X[:, idx]), dtype=np.float64)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                continue
+            diff = np.abs(y - y_primary)
+            rel = diff / np.maximum(np.abs(y_primary), 1e-9)
+            with self._lock:
+                self.scored += len(y)
+                self._sum_abs += float(diff.sum())
+                self._sum_rel += float(rel.sum())
+                self._max_abs = max(self._max_abs, float(diff.max(initial=0.0)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self.scored
+            return {
+                "candidate": self.candidate,
+                "sample_rate": self.sample_rate,
+                "scored": n,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "mean_abs_diff": self._sum_abs / n if n else None,
+                "mean_rel_diff": self._sum_rel / n if n else None,
+                "max_abs_diff": self._max_abs if n else None,
+            }
@@ -1,11 +1,20 @@
 """
 Script de treino do modelo de previsão de HH.
 Carrega dataset, treina duas variantes (4 e 5 features), salva modelo, scalers e metadados.
+Com --seeds, cada variante é treinada também com outras seeds (só métricas: média e desvio
+de MAE/RMSE/R² em model_metadata.json); os artefatos salvos são os da seed principal (--seed).
+Com --workers > 1 cada (variante, seed) roda num processo separado, com threads limitadas
+a --threads-per-worker para os processos não disputarem os mesmos núcleos.
 Uso: python train.py [--config config.yaml] [--dataset data/processed/dataset_uti_vs_hh_semanal.csv]
+     [--seeds 42 43 44] [--workers 4]
 """
 import argparse
 import json
+import multiprocessing
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
@@ -18,6 +27,10 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 
+from mlops.registry import from_config as registry_from_config
+from pipeline import artifacts, schema
+from serving.inference import export_numpy, npz_path
+
 
 def load_config(config_path: str) -> dict:
     path = Path(config_path)
@@ -38,12 +51,128 @@ def build_model(input_dim: int, units: list[int] = (100, 100)):
     return model
 
 
+def _pin_threads(threads: int) -> None:
+    """Limita BLAS (NumPy/scikit-learn) e TensorFlow a `threads` threads neste processo."""
+    from threadpoolctl import threadpool_limits
+
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    threadpool_limits(threads)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def train_variant(
+    data: pd.DataFrame,
+    variant_name: str,
+    features: list[str],
+    target: str,
+    seed: int,
+    split_seed: int,
+    params: dict,
+    models_dir: Path | None = None,
+    verbose: int = 1,
+) -> dict:
+    """
+    Treina uma variante com uma seed (inicialização dos pesos e ordem dos lotes).
+    O split treino/teste usa split_seed, igual para todas as seeds (métricas comparáveis).
+    Com models_dir, salva modelo, scalers e .npz e inclui os caminhos no resultado.
+    """
+    # Python, NumPy, TensorFlow e o gerador do Keras (para o resultado não depender da ordem dos jobs)
+    tf.keras.utils.set_random_seed(seed)
+    t0 = time.perf_counter()
+
+    X = data[features]
+    y = data[target].values.reshape(-1, 1)
+
+    scaler_X = MinMaxScaler()
+    scaler_y = MinMaxScaler()
+    X_scaled = scaler_X.fit_transform(X)
+    y_scaled = scaler_y.fit_transform(y)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y_scaled, test_size=params["test_size"], random_state=split_seed
+    )
+
+    model = build_model(input_dim=len(features), units=params["units"])
+    model.fit(
+        X_train, y_train,
+        epochs=params["epochs"],
+        batch_size=params["batch_size"],
+        validation_split=params["validation_split"],
+        verbose=verbose,
+    )
+
+    y_pred_scaled = model.predict(X_test, verbose=verbose)
+    y_pred = scaler_y.inverse_transform(y_pred_scaled)
+    y_test_orig = scaler_y.inverse_transform(y_test)
+
+    mae = mean_absolute_error(y_test_orig, y_pred)
+    rmse = np.sqrt(mean_squared_error(y_test_orig, y_pred))
+    r2 = r2_score(y_test_orig, y_pred)
+    n, k = len(X_test), len(features)
+    adj_r2 = 1 - (1 - r2) * (n - 1) / (n - k - 1) if n > k + 1 else r2
+
+    result = {"features": features}
+    if models_dir is not None:
+        model_path = models_dir / f"model_hh_semanal_{variant_name}.keras"
+        scaler_x_path = models_dir / f"scaler_X_{variant_name}.joblib"
+        scaler_y_path = models_dir / f"scaler_y_{variant_name}.joblib"
+
+        model.save(model_path)
+        joblib.dump(scaler_X, scaler_x_path)
+        joblib.dump(scaler_y, scaler_y_path)
+        # Pesos + scalers em NumPy para o app servir sem TensorFlow
+        numpy_path = export_numpy(model, scaler_X, scaler_y, npz_path(models_dir, variant_name), features)
+        result.update({
+            "model_path": str(model_path),
+            "scaler_X_path": str(scaler_x_path),
+            "scaler_y_path": str(scaler_y_path),
+            "numpy_path": str(numpy_path),
+        })
+    result.update({
+        "MAE": float(mae),
+        "RMSE": float(rmse),
+        "R2": float(r2),
+        "Adj_R2": float(adj_r2),
+        "seconds": round(time.perf_counter() - t0, 2),
+    })
+    return result
+
+
+def _train_job(job: dict, threads: int) -> dict:
+    """Entrada do worker: fixa as threads e treina (sem log por época, que se misturaria)."""
+    _pin_threads(threads)
+    return train_variant(**job, verbose=0)
+
+
+def stability(runs: dict[int, dict]) -> dict:
+    """Média e desvio padrão (amostral) de cada métrica entre as seeds."""
+    out = {}
+    for metric in ("MAE", "RMSE", "R2", "Adj_R2"):
+        valores = np.array([r[metric] for r in runs.values()])
+        out[metric] = {
+            "mean": float(valores.mean()),
+            "std": float(valores.std(ddof=1)) if len(valores) > 1 else 0.0,
+        }
+    return out
+
+
 def main():
     parser = argparse.ArgumentParser(description="Treino do modelo HH - TCC")
     parser.add_argument("--config", default="config.yaml", help="Caminho para config.yaml")
-    parser.add_argument("--dataset", default=None, help="Caminho para dataset_uti_vs_hh_semanal.csv")
+    parser.add_argument(
+        "--dataset", default=None,
+        help="Caminho para o dataset semanal (.csv, .parquet ou .feather)",
+    )
     parser.add_argument("--seed", type=int, default=42, help="Seed para reprodutibilidade")
     parser.add_argument("--version", default=None, help="Versão do modelo (ex: 1.0.0). Se omitido, usa data YYYYMMDD.")
+    parser.add_argument(
+        "--seeds", type=int, nargs="+", default=None,
+        help="Seeds extras por variante para medir estabilidade (ex: --seeds 42 43 44)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Processos de treino em paralelo (1 = sequencial)")
+    parser.add_argument("--threads-per-worker", type=int, default=None, help="Threads de cada processo de treino")
     args = parser.parse_args()
 
     base = Path(__file__).resolve().parent
@@ -59,6 +188,10 @@ def main():
     dataset_path = Path(dataset_path)
     if not dataset_path.is_absolute():
         dataset_path = proj / dataset_path
+    if not args.dataset:
+        # Sem --dataset: usa o artefato no formato da pipeline (ex.: .parquet), ou o CSV
+        fmt = config.get("data_pipeline", {}).get("artifact_format", "csv")
+        dataset_path = artifacts.find(dataset_path, fmt) or dataset_path
     if not dataset_path.exists():
         print(f"Dataset não encontrado: {dataset_path}")
         sys.exit(1)
@@ -81,93 +214,103 @@ def main():
     batch_size = train_cfg.get("batch_size", 50)
     units = train_cfg.get("units", [100, 100])
     random_state = args.seed
+    # A seed principal (artefatos salvos) vem primeiro; as demais só entram nas métricas
+    seeds = args.seeds or train_cfg.get("seeds") or [random_state]
+    seeds = [random_state] + [s for s in dict.fromkeys(seeds) if s != random_state]
+    workers = int(args.workers or train_cfg.get("workers", 1) or 1)
+    threads = args.threads_per_worker or train_cfg.get("threads_per_worker") or max(1, (os.cpu_count() or 1) // workers)
 
-    np.random.seed(random_state)
-    tf.random.set_seed(random_state)
-
-    data = pd.read_csv(dataset_path, encoding="ISO-8859-1")
-    data["date"] = pd.to_datetime(data["date"])
+    data = artifacts.read(dataset_path, schema=schema.DATASET, encoding="ISO-8859-1")
 
     metadata = {
         "dataset": str(dataset_path),
         "trained_at": datetime.now().isoformat(),
         "random_state": random_state,
+        "seeds": seeds,
         "test_size": test_size,
         "validation_split": val_split,
         "epochs": epochs,
         "batch_size": batch_size,
         "models": {},
     }
+    params = {
+        "test_size": test_size,
+        "validation_split": val_split,
+        "epochs": epochs,
+        "batch_size": batch_size,
+        "units": units,
+    }
 
-    for variant_name, features in [("4features", features_4), ("5features", features_5)]:
+    variants = [("4features", features_4), ("5features", features_5)]
+    for variant_name, features in variants:
         for f in features:
             if f not in data.columns:
                 print(f"Coluna ausente no dataset: {f}")
                 sys.exit(1)
-        X = data[features]
-        y = data[target].values.reshape(-1, 1)
-
-        scaler_X = MinMaxScaler()
-        scaler_y = MinMaxScaler()
-        X_scaled = scaler_X.fit_transform(X)
-        y_scaled = scaler_y.fit_transform(y)
-
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_scaled, y_scaled, test_size=test_size, random_state=random_state
-        )
-
-        model = build_model(input_dim=len(features), units=units)
-        hist = model.fit(
-            X_train, y_train,
-            epochs=epochs,
-            batch_size=batch_size,
-            validation_split=val_split,
-            verbose=1,
-        )
-
-        y_pred_scaled = model.predict(X_test)
-        y_pred = scaler_y.inverse_transform(y_pred_scaled)
-        y_test_orig = scaler_y.inverse_transform(y_test)
-
-        mae = mean_absolute_error(y_test_orig, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test_orig, y_pred))
-        r2 = r2_score(y_test_orig, y_pred)
-        n, k = len(X_test), len(features)
-        adj_r2 = 1 - (1 - r2) * (n - 1) / (n - k - 1) if n > k + 1 else r2
 
-        model_path = models_dir / f"model_hh_semanal_{variant_name}.keras"
-        scaler_x_path = models_dir / f"scaler_X_{variant_name}.joblib"
-        scaler_y_path = models_dir / f"scaler_y_{variant_name}.joblib"
-
-        model.save(model_path)
-        joblib.dump(scaler_X, scaler_x_path)
-        joblib.dump(scaler_y, scaler_y_path)
-
-        metadata["models"][variant_name] = {
+    jobs = [
+        {
+            "data": data[features + [target]],
+            "variant_name": variant_name,
             "features": features,
-            "model_path": str(model_path),
-            "scaler_X_path": str(scaler_x_path),
-            "scaler_y_path": str(scaler_y_path),
-            "MAE": float(mae),
-            "RMSE": float(rmse),
-            "R2": float(r2),
-            "Adj_R2": float(adj_r2),
+            "target": target,
+            "seed": seed,
+            "split_seed": random_state,
+            "params": params,
+            "models_dir": models_dir if seed == random_state else None,
         }
-        print(f"\n{variant_name}: MAE={mae:.3f}, RMSE={rmse:.3f}, R2={r2:.4f} -> {model_path}")
+        for variant_name, features in variants
+        for seed in seeds
+    ]
+
+    t0 = time.perf_counter()
+    runs = {}
+    if workers > 1 and len(jobs) > 1:
+        print(f"Treinando {len(jobs)} jobs (variante x seed) em {workers} processos, {threads} thread(s) cada")
+        # spawn: TensorFlow não é seguro após fork
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx) as pool:
+            futures = {pool.submit(_train_job, job, threads): job for job in jobs}
+            for fut in as_completed(futures):
+                job = futures[fut]
+                r = fut.result()
+                runs[(job["variant_name"], job["seed"])] = r
+                print(f"  {job['variant_name']} seed {job['seed']}: MAE={r['MAE']:.3f}, RMSE={r['RMSE']:.3f}, "
+                      f"R2={r['R2']:.4f} ({r['seconds']:.1f}s)")
+    else:
+        for job in jobs:
+            r = train_variant(**job, verbose=1 if job["models_dir"] is not None else 0)
+            runs[(job["variant_name"], job["seed"])] = r
+            if len(seeds) > 1:
+                print(f"  {job['variant_name']} seed {job['seed']}: MAE={r['MAE']:.3f}, RMSE={r['RMSE']:.3f}, "
+                      f"R2={r['R2']:.4f} ({r['seconds']:.1f}s)")
+    print(f"Tempo total de treino: {time.perf_counter() - t0:.1f}s")
+
+    for variant_name, _ in variants:
+        entry = dict(runs[(variant_name, random_state)])
+        entry.pop("seconds", None)
+        if len(seeds) > 1:
+            por_seed = {seed: runs[(variant_name, seed)] for seed in seeds}
+            entry["seeds"] = {
+                str(seed): {m: r[m] for m in ("MAE", "RMSE", "R2", "Adj_R2")} for seed, r in por_seed.items()
+            }
+            entry["stability"] = stability(por_seed)
+        metadata["models"][variant_name] = entry
+        print(f"\n{variant_name}: MAE={entry['MAE']:.3f}, RMSE={entry['RMSE']:.3f}, R2={entry['R2']:.4f} "
+              f"-> {entry['model_path']}")
+        if len(seeds) > 1:
+            st = entry["stability"]
+            print(f"  {len(seeds)} seeds: MAE {st['MAE']['mean']:.3f} ± {st['MAE']['std']:.3f}, "
+                  f"RMSE {st['RMSE']['mean']:.3f} ± {st['RMSE']['std']:.3f}, "
+                  f"R2 {st['R2']['mean']:.4f} ± {st['R2']['std']:.4f}")
 
     meta_path = models_dir / "model_metadata.json"
     with open(meta_path, "w", encoding="utf-8") as f:
         json.dump(metadata, f, indent=2)
     print(f"\nMetadados salvos: {meta_path}")
 
-    # Registry MLOps: registrar esta versão para rastreio e "latest"
-    mlops_cfg = config.get("mlops", {})
-    registry_path = proj / mlops_cfg.get("registry_file", "models/registry.json")
-    registry_path.parent.mkdir(parents=True, exist_ok=True)
-    registry = {"versions": []}
-    if registry_path.exists():
-        with open(registry_path, "r", encoding="utf-8") as f:
-            registry = json.load(f)
+    # Registry MLOps: registrar esta versão para rastreio e "latest" (SQLite + export registry.json)
+    registry = registry_from_config(config, proj)
     try:
         path_rel = str(models_dir.relative_to(proj))
     except ValueError:
@@ -180,10 +323,8 @@ def main():
         "metrics_5features": metadata["models"].get("5features", {}),
         "metrics_4features": metadata["models"].get("4features", {}),
     }
-    registry["versions"] = registry.get("versions", []) + [entry]
-    with open(registry_path, "w", encoding="utf-8") as f:
-        json.dump(registry, f, indent=2)
-    print(f"Registry atualizado: {registry_path}")
+    registry.register(entry)
+    print(f"Registry atualizado: {registry.db_path} (export: {registry.json_path})")
     return 0
 
 